@@ -0,0 +1,370 @@
+from enum import IntFlag
+from typing import Optional
+
+# Python port of StudioCommunication/Actions.cs and StudioCommunication/ActionLine.cs
+# Needs to be kept in sync with the C# implementation
+
+class Actions(IntFlag):
+    NONE = 0
+    LEFT = 1 << 0
+    RIGHT = 1 << 1
+    UP = 1 << 2
+    DOWN = 1 << 3
+    JUMP = 1 << 4
+    JUMP2 = 1 << 5
+    DASH = 1 << 6
+    DASH2 = 1 << 7
+    GRAB = 1 << 8
+    GRAB2 = 1 << 9
+    START = 1 << 10
+    RESTART = 1 << 11
+    FEATHER = 1 << 12
+    JOURNAL = 1 << 13
+    CONFIRM = 1 << 14
+    DEMO_DASH = 1 << 15
+    DEMO_DASH2 = 1 << 16
+    DASH_ONLY = 1 << 17
+    LEFT_DASH_ONLY = 1 << 18
+    RIGHT_DASH_ONLY = 1 << 19
+    UP_DASH_ONLY = 1 << 20
+    DOWN_DASH_ONLY = 1 << 21
+    MOVE_ONLY = 1 << 22
+    LEFT_MOVE_ONLY = 1 << 23
+    RIGHT_MOVE_ONLY = 1 << 24
+    UP_MOVE_ONLY = 1 << 25
+    DOWN_MOVE_ONLY = 1 << 26
+    PRESSED_KEY = 1 << 27
+
+# Plain ints are used while parsing, since combining IntFlag members is comparatively slow
+action_chars = {
+    'L': int(Actions.LEFT),
+    'R': int(Actions.RIGHT),
+    'U': int(Actions.UP),
+    'D': int(Actions.DOWN),
+    'J': int(Actions.JUMP),
+    'K': int(Actions.JUMP2),
+    'Z': int(Actions.DEMO_DASH),
+    'V': int(Actions.DEMO_DASH2),
+    'X': int(Actions.DASH),
+    'C': int(Actions.DASH2),
+    'G': int(Actions.GRAB),
+    'H': int(Actions.GRAB2),
+    'S': int(Actions.START),
+    'Q': int(Actions.RESTART),
+    'N': int(Actions.JOURNAL),
+    'O': int(Actions.CONFIRM),
+    'A': int(Actions.DASH_ONLY),
+    'M': int(Actions.MOVE_ONLY),
+    'P': int(Actions.PRESSED_KEY),
+    'F': int(Actions.FEATHER),
+}
+# Include lowercase variants, to avoid calling upper() for every character
+action_chars |= { c.lower(): action for c, action in action_chars.items() }
+
+dash_only_chars = {
+    'L': int(Actions.LEFT_DASH_ONLY),
+    'R': int(Actions.RIGHT_DASH_ONLY),
+    'U': int(Actions.UP_DASH_ONLY),
+    'D': int(Actions.DOWN_DASH_ONLY),
+}
+dash_only_chars |= { c.lower(): action for c, action in dash_only_chars.items() }
+
+move_only_chars = {
+    'L': int(Actions.LEFT_MOVE_ONLY),
+    'R': int(Actions.RIGHT_MOVE_ONLY),
+    'U': int(Actions.UP_MOVE_ONLY),
+    'D': int(Actions.DOWN_MOVE_ONLY),
+}
+move_only_chars |= { c.lower(): action for c, action in move_only_chars.items() }
+
+# Order in which actions are written, see ActionsUtils.Sorted()
+sorted_actions = [
+    (int(Actions.LEFT), 'L'),
+    (int(Actions.RIGHT), 'R'),
+    (int(Actions.UP), 'U'),
+    (int(Actions.DOWN), 'D'),
+    (int(Actions.JUMP), 'J'),
+    (int(Actions.JUMP2), 'K'),
+    (int(Actions.DASH), 'X'),
+    (int(Actions.DASH2), 'C'),
+    (int(Actions.DEMO_DASH), 'Z'),
+    (int(Actions.DEMO_DASH2), 'V'),
+    (int(Actions.GRAB), 'G'),
+    (int(Actions.GRAB2), 'H'),
+    (int(Actions.START), 'S'),
+    (int(Actions.RESTART), 'Q'),
+    (int(Actions.JOURNAL), 'N'),
+    (int(Actions.CONFIRM), 'O'),
+    (int(Actions.DASH_ONLY), 'A'),
+    (int(Actions.MOVE_ONLY), 'M'),
+    (int(Actions.PRESSED_KEY), 'P'),
+    (int(Actions.FEATHER), 'F'),
+]
+dash_only_actions = [(int(Actions.LEFT_DASH_ONLY), 'L'), (int(Actions.RIGHT_DASH_ONLY), 'R'), (int(Actions.UP_DASH_ONLY), 'U'), (int(Actions.DOWN_DASH_ONLY), 'D')]
+move_only_actions = [(int(Actions.LEFT_MOVE_ONLY), 'L'), (int(Actions.RIGHT_MOVE_ONLY), 'R'), (int(Actions.UP_MOVE_ONLY), 'U'), (int(Actions.DOWN_MOVE_ONLY), 'D')]
+
+DASH_ONLY = int(Actions.DASH_ONLY)
+MOVE_ONLY = int(Actions.MOVE_ONLY)
+PRESSED_KEY = int(Actions.PRESSED_KEY)
+FEATHER = int(Actions.FEATHER)
+
+DELIMITER = ','
+MAX_FRAMES = 9999
+MAX_FRAMES_DIGITS = 4
+
+def try_parse_int(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+def try_parse_float(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def format_float(value: float) -> str:
+    return str(int(value)) if value.is_integer() else str(value)
+
+class ActionLine:
+    __slots__ = ("actions", "_frames", "_frame_count", "feather_angle", "feather_magnitude", "custom_bindings")
+
+    def __init__(self, frames: str = "", actions: int = Actions.NONE, feather_angle: Optional[str] = None, feather_magnitude: Optional[str] = None, custom_bindings: Optional[set[str]] = None):
+        self.frames = frames
+        self.actions = Actions(actions)
+        self.feather_angle = feather_angle
+        self.feather_magnitude = feather_magnitude
+        self.custom_bindings = custom_bindings if custom_bindings is not None else set()
+
+    @property
+    def frames(self) -> str:
+        return self._frames
+    @frames.setter
+    def frames(self, value: str):
+        self._frames = value.strip()
+        self._frame_count = try_parse_int(self._frames) or 0
+
+    @property
+    def frame_count(self) -> int:
+        return self._frame_count
+    @frame_count.setter
+    def frame_count(self, value: int):
+        self._frame_count = value
+        self._frames = str(value)
+
+    def __eq__(self, other):
+        if not isinstance(other, ActionLine):
+            return NotImplemented
+        return (self._frames == other._frames and self.actions == other.actions and
+                self.feather_angle == other.feather_angle and self.feather_magnitude == other.feather_magnitude and
+                self.custom_bindings == other.custom_bindings)
+
+    def __repr__(self):
+        return f"ActionLine({str(self).strip()!r})"
+
+    def __str__(self):
+        # Plain ints are used, since combining IntFlag members is comparatively slow
+        flags = int(self.actions)
+
+        actions = ""
+        for action, char in sorted_actions:
+            if not flags & action:
+                continue
+
+            if action == DASH_ONLY:
+                actions += DELIMITER + char + "".join(c for a, c in dash_only_actions if flags & a)
+            elif action == MOVE_ONLY:
+                actions += DELIMITER + char + "".join(c for a, c in move_only_actions if flags & a)
+            elif action == PRESSED_KEY:
+                actions += DELIMITER + char + "".join(sorted(self.custom_bindings))
+            else:
+                actions += DELIMITER + char
+
+        feather_angle = f"{DELIMITER}{self.feather_angle or ''}" if flags & FEATHER else ""
+        feather_magnitude = f"{DELIMITER}{self.feather_magnitude}" if flags & FEATHER and self.feather_magnitude is not None else ""
+
+        return f"{self.frames:>{MAX_FRAMES_DIGITS}}{actions}{feather_angle}{feather_magnitude}"
+
+    @staticmethod
+    def parse(line: str, ignore_invalid_floats=True) -> Optional["ActionLine"]:
+        """Parses action-lines, trying the strict format first and falling back to the loose one"""
+        return ActionLine.parse_strict(line, ignore_invalid_floats) or ActionLine.parse_loose(line, ignore_invalid_floats)
+
+    @staticmethod
+    def parse_strict(line: str, ignore_invalid_floats=True) -> Optional["ActionLine"]:
+        """Parses action-lines, which mostly follow the correct formatting (for example: "  15,R,Z")"""
+        tokens = [token.strip() for token in line.split(DELIMITER)]
+
+        frames = tokens[0]
+        if frames and try_parse_int(frames) is None:
+            return None
+
+        actions = 0
+        custom_bindings = set()
+        feather_angle = None
+        feather_magnitude = None
+
+        i = 1
+        count = len(tokens)
+        while i < count:
+            token = tokens[i]
+            i += 1
+            if not token:
+                continue
+
+            action = action_chars.get(token[0], 0)
+            actions |= action
+
+            # Parse dash-only/move-only/custom bindings
+            if action == DASH_ONLY:
+                for c in token[1:]:
+                    actions |= dash_only_chars.get(c) or action_chars.get(c, 0)
+                continue
+            if action == MOVE_ONLY:
+                for c in token[1:]:
+                    actions |= move_only_chars.get(c) or action_chars.get(c, 0)
+                continue
+            if action == PRESSED_KEY:
+                custom_bindings = set(token[1:].upper())
+                continue
+            if len(token) != 1:
+                # This token isn't allowed to have multiple actions
+                return None
+
+            if action != FEATHER:
+                continue
+
+            # Parse feather angle/magnitude
+            angle = try_parse_float(tokens[i]) if i < count else None
+            valid_angle = i >= count or angle is not None
+            if angle is not None:
+                feather_angle = "360" if angle > 360.0 else "0" if angle < 0.0 else tokens[i]
+                i += 1
+
+                # Allow empty magnitude, so the comma won't get removed
+                if i < count:
+                    magnitude = try_parse_float(tokens[i])
+                    if not tokens[i] or magnitude is not None:
+                        if magnitude is None:
+                            feather_magnitude = tokens[i]
+                        else:
+                            feather_magnitude = "1" if magnitude > 1.0 else "0" if magnitude < 0.0 else tokens[i]
+                        i += 1
+                    elif not ignore_invalid_floats:
+                        return None
+            elif not valid_angle and i + 1 < count and not tokens[i] and (angle := try_parse_float(tokens[i + 1])) is not None:
+                # Empty angle, treat magnitude as angle
+                feather_angle = "360" if angle > 360.0 else "0" if angle < 0.0 else tokens[i]
+                i += 2
+            elif not valid_angle and not ignore_invalid_floats:
+                return None
+
+        if not frames and actions == 0 and not custom_bindings and feather_angle is None and feather_magnitude is None:
+            # Frameless action lines require some other actions
+            return None
+
+        return ActionLine(frames, actions, feather_angle, feather_magnitude, custom_bindings)
+
+    @staticmethod
+    def parse_loose(line: str, ignore_invalid_floats=True) -> Optional["ActionLine"]:
+        """Parses action-lines, which mostly are correct (for example: "1gd")"""
+        STATE_FRAME, STATE_ACTION, STATE_DASH_ONLY, STATE_MOVE_ONLY, STATE_PRESSED_KEY, STATE_FEATHER_ANGLE, STATE_FEATHER_MAGNITUDE = range(7)
+
+        state = STATE_FRAME
+        frames = ""
+        current_value = ""
+        actions = 0
+        custom_bindings = set()
+        feather_angle = None
+        feather_magnitude = None
+
+        for c in line:
+            if c.isspace():
+                continue
+
+            if state == STATE_FRAME:
+                if c == DELIMITER:
+                    if current_value and try_parse_int(current_value) is None:
+                        # Invalid action-line
+                        return None
+                    frames = current_value
+                    current_value = ""
+                    state = STATE_ACTION
+                    continue
+
+                if c.isdigit():
+                    current_value += c
+                    continue
+
+                if try_parse_int(current_value) is None:
+                    # Invalid action-line
+                    return None
+                frames = current_value
+                current_value = ""
+                state = STATE_ACTION
+            elif state == STATE_DASH_ONLY or state == STATE_MOVE_ONLY:
+                if c == DELIMITER:
+                    state = STATE_ACTION
+                    continue
+
+                directional_action = (dash_only_chars if state == STATE_DASH_ONLY else move_only_chars).get(c)
+                if directional_action is not None:
+                    actions |= directional_action
+                    continue
+                state = STATE_ACTION
+            elif state == STATE_PRESSED_KEY:
+                if c == DELIMITER:
+                    state = STATE_ACTION
+                    continue
+
+                custom_bindings.add(c.upper())
+                continue
+            elif state == STATE_FEATHER_ANGLE or state == STATE_FEATHER_MAGNITUDE:
+                if c == DELIMITER:
+                    state = STATE_FEATHER_MAGNITUDE if state == STATE_FEATHER_ANGLE else STATE_ACTION
+                    continue
+
+                if c.isdigit() or c == '.':
+                    if state == STATE_FEATHER_ANGLE:
+                        feather_angle = (feather_angle or "") + c
+                    else:
+                        feather_magnitude = (feather_magnitude or "") + c
+                    continue
+                state = STATE_ACTION
+
+            # STATE_ACTION
+            if c == DELIMITER:
+                continue
+
+            action = action_chars.get(c, 0)
+            actions |= action
+            if action == DASH_ONLY:
+                state = STATE_DASH_ONLY
+            elif action == MOVE_ONLY:
+                state = STATE_MOVE_ONLY
+            elif action == PRESSED_KEY:
+                state = STATE_PRESSED_KEY
+            elif action == FEATHER:
+                state = STATE_FEATHER_ANGLE
+            else:
+                state = STATE_ACTION
+
+        # Clamp angle / magnitude
+        if feather_angle is not None:
+            angle = try_parse_float(feather_angle)
+            if angle is not None:
+                feather_angle = format_float(min(max(angle, 0.0), 360.0))
+            elif not ignore_invalid_floats:
+                return None
+        if feather_magnitude is not None:
+            magnitude = try_parse_float(feather_magnitude)
+            if magnitude is not None:
+                feather_magnitude = format_float(min(max(magnitude, 0.0), 1.0))
+            elif not ignore_invalid_floats:
+                return None
+
+        if state == STATE_FRAME:
+            return None
+
+        return ActionLine(frames, actions, feather_angle, feather_magnitude, custom_bindings)
@@ -0,0 +1,251 @@
+import re
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from dataclasses import dataclass, asdict
+
+import zconvert
+import generate_changelog
+from action_line import ActionLine, Actions
+from tas_rules import RuleSet, rules
+from frame_index import FrameIndexer
+
+# Regex based conversion, which zconvert.py used before parsing action lines
+legacy_regex_1Line = re.compile(r' 4,D,[X|C]')
+legacy_regex_2Line = re.compile(r' (4|1),D,[X|C]\s*(\d+)(.*)[X|C]')
+
+def legacy_ZReplace(match):
+    return ' ' + str(int(match.group(1)) + int(match.group(2))) + match.group(3) + 'Z'
+
+def legacy_convert(text):
+    text = legacy_regex_2Line.sub(legacy_ZReplace, text)
+    return legacy_regex_1Line.sub(' 4,Z', text)
+
+## Corpus generation
+
+movement_actions = ["R", "L", "R,U", "L,U", "R,D", "L,D", "U", "D", ""]
+extra_actions = ["", "", "", "J", "K", "G", "J,G", "X", "C", "Z"]
+room_names = ["a-00", "a-01", "a-02", "b-00", "b-01", "c-00", "c-01", "d-00"]
+
+def generate_action_line(rng: random.Random) -> str:
+    if rng.random() < 0.03:
+        return str(ActionLine(str(rng.randint(1, 40)), Actions.FEATHER, f"{rng.uniform(0, 360):.1f}", f"{rng.random():.2f}"))
+
+    frames = rng.choice([1, 1, 2, 3, 4, 5, 8, 10, 14, 20, 35, 60, 120])
+    actions = [action for action in (rng.choice(movement_actions), rng.choice(extra_actions)) if action]
+    return f"{frames:>4}" + "".join(f",{action}" for action in actions)
+
+def generate_tas_lines(rng: random.Random, line_count: int, grab_density: float, library_files: list[str]) -> list[str]:
+    lines = ["#Start", "console load 1 a-00 0 0", "   1", ""]
+    repeat_depth = 0
+    while len(lines) < line_count:
+        roll = rng.random()
+        if roll < grab_density:
+            # Grab-buffer idioms which zconvert.py converts
+            lines.append(rng.choice(["   4,D,X", "   4,D,C", "   1,D,X"]))
+            if rng.random() < 0.7:
+                lines.append(f"{rng.randint(1, 20):>4},{rng.choice(['R', 'L', 'U', 'R,U'])},{rng.choice(['X', 'C'])}")
+        elif roll < grab_density + 0.04:
+            lines += ["", f"#lvl_{rng.choice(room_names)}"]
+        elif roll < grab_density + 0.08:
+            lines.append(f"# {rng.choice(['cycle', 'setup', 'fastest', 'safe', 'alternative'])} {rng.randint(0, 99)}")
+        elif roll < grab_density + 0.09 and library_files:
+            lines.append(f"Read, {rng.choice(library_files)}, Start, End")
+        elif roll < grab_density + 0.10 and repeat_depth == 0:
+            lines.append(f"Repeat {rng.randint(2, 5)}")
+            repeat_depth += 1
+        elif roll < grab_density + 0.13 and repeat_depth > 0:
+            lines.append("EndRepeat")
+            repeat_depth -= 1
+        elif roll < grab_density + 0.14:
+            lines.append("***")
+        else:
+            lines.append(generate_action_line(rng))
+
+    lines += ["EndRepeat"] * repeat_depth
+    lines += ["", "#End", "ChapterTime: 0:00.000(0)"]
+    return lines
+
+def generate_changelog_file(rng: random.Random, path: str, version_count: int):
+    words = "the of auto complete studio input feather dash grab fix crash when setting command file info hud frame level room".split()
+    def sentence(length):
+        return " ".join(rng.choice(words) for _ in range(length)).capitalize()
+
+    with open(path, "w") as f:
+        for version in range(version_count, 0, -1):
+            f.write(f"# CelesteTAS v3.{version}.0, Studio v3.{version // 2}.0\n\n")
+            for page in range(rng.randint(0, 2)):
+                f.write(f"## {sentence(3)}\n")
+                if rng.random() < 0.7:
+                    f.write(f"<!-- IMAGE {rng.choice(['left', 'right'])} {rng.randint(200, 400)} {rng.randint(150, 350)} Assets/v3.{version}.0/Image{page}.png -->\n")
+                f.write("\n")
+                for _ in range(rng.randint(2, 12)):
+                    f.write(sentence(rng.randint(6, 16)) + ".\n")
+                f.write("\n---\n\n")
+            for _ in range(rng.randint(5, 30)):
+                f.write(f"- {rng.choice(list(generate_changelog.categories)).capitalize()}: {sentence(rng.randint(4, 12))}\n")
+            f.write("\n")
+
+def generate_corpus(output_dir: str, file_count: int, line_count: int, grab_density: float, version_count: int, seed: int):
+    """Deterministically generates chapter folders of TAS files, shared library files and a CHANGELOG.md"""
+    rng = random.Random(seed)
+
+    library_count = max(1, file_count // 20)
+    library_files = [f"../lib/Shared_{i:03}" for i in range(library_count)]
+    os.makedirs(os.path.join(output_dir, "lib"), exist_ok=True)
+    for i in range(library_count):
+        with open(os.path.join(output_dir, "lib", f"Shared_{i:03}.tas"), "w") as f:
+            f.write("\n".join(generate_tas_lines(rng, line_count // 10, grab_density, [])) + "\n")
+
+    for i in range(file_count):
+        chapter_dir = os.path.join(output_dir, f"Chapter{i % 10}")
+        os.makedirs(chapter_dir, exist_ok=True)
+        with open(os.path.join(chapter_dir, f"{i % 10}A_{i:04}.tas"), "w") as f:
+            f.write("\n".join(generate_tas_lines(rng, line_count, grab_density, library_files)) + "\n")
+
+    generate_changelog_file(rng, os.path.join(output_dir, "CHANGELOG.md"), version_count)
+
+## Benchmarks
+
+@dataclass
+class Result:
+    name: str
+    seconds: float
+    lines_per_second: float
+    megabytes_per_second: float
+    peak_memory_mb: float
+
+def measure(name, func, line_count, byte_count, repeat, setup=None) -> Result:
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+
+    # Memory is traced in a separate run, since tracing slows down execution
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = Result(name, best, line_count / best, byte_count / best / 1_000_000, peak / 1_000_000)
+    print(f"{name:<28} {best * 1000:>10.2f}ms {result.lines_per_second:>14,.0f} lines/s {result.megabytes_per_second:>8.2f} MB/s {result.peak_memory_mb:>8.2f} MB peak", flush=True)
+    return result
+
+def benchmark_tas(files: list[str], repeat: int) -> list[Result]:
+    texts = []
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            texts.append(f.read())
+    text = "".join(texts)
+    lines = text.splitlines(keepends=True)
+    line_count, byte_count = len(lines), len(text.encode())
+
+    print(f"TAS corpus: {len(files)} files, {line_count} lines, {byte_count / 1_000_000:.2f} MB", flush=True)
+    results = [
+        measure("regex conversion", lambda: legacy_convert(text), line_count, byte_count, repeat),
+        measure("ActionLine.parse", lambda: [ActionLine.parse(line) for line in lines], line_count, byte_count, repeat),
+        measure("RuleSet.process (default)", lambda: sum(1 for _ in RuleSet().process(lines)), line_count, byte_count, repeat),
+        measure("RuleSet.process (all rules)", lambda: sum(1 for _ in RuleSet(rules).process(lines)), line_count, byte_count, repeat),
+    ]
+
+    # Convert copies of the files, so that every run has to do the same work
+    with tempfile.TemporaryDirectory() as temp_dir:
+        copies = [os.path.join(temp_dir, f"{i}.tas") for i in range(len(files))]
+        def copy_files():
+            for filepath, copy in zip(files, copies):
+                shutil.copyfile(filepath, copy)
+        results.append(measure("zconvert.convert_file", lambda: [zconvert.convert_file(copy) for copy in copies], line_count, byte_count, repeat, setup=copy_files))
+
+    results.append(measure("FrameIndexer.index", lambda: [FrameIndexer().index(filepath) for filepath in files], line_count, byte_count, repeat))
+    return results
+
+def benchmark_changelog(changelog_file: str, repeat: int) -> list[Result]:
+    with open(changelog_file, 'rb') as f:
+        data = f.read()
+    line_count, byte_count = data.count(b"\n"), len(data)
+
+    print(f"Changelog: {line_count} lines, {byte_count / 1_000_000:.2f} MB", flush=True)
+    changelog = generate_changelog.Changelog(changelog_file)
+    results = [measure("parse_changelog", lambda: generate_changelog.parse_changelog(changelog_file), line_count, byte_count, repeat)]
+    if not changelog.entries:
+        print("Changelog doesn't contain any versions, skipping 'Changelog.find'", flush=True)
+        return results
+
+    newest = changelog.entries[0]
+    results.append(measure("Changelog.find (newest)", lambda: generate_changelog.Changelog(changelog_file).find(newest.celestetas_version, newest.studio_version), line_count, byte_count, repeat))
+    return results
+
+def compare(results: list[Result], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path, "r") as f:
+        baseline = { result["name"]: result for result in json.load(f) }
+
+    success = True
+    for result in results:
+        if result.name not in baseline:
+            continue
+        ratio = result.lines_per_second / baseline[result.name]["lines_per_second"]
+        if ratio < 1.0 - tolerance:
+            print(f"Regression in '{result.name}': {ratio:.0%} of baseline throughput", file=sys.stderr, flush=True)
+            success = False
+    return success
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the hot paths of the TAS tooling and release scripts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="Generate a synthetic corpus of TAS files and a CHANGELOG.md")
+    generate_parser.add_argument("output", help="Directory to write the corpus into")
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("paths", nargs="*", help="TAS files or directories to use as corpus (default: generate a synthetic one)")
+    run_parser.add_argument("--changelog", help="CHANGELOG file to parse (default: the one of the synthetic corpus)")
+    run_parser.add_argument("-n", "--repeat", type=int, default=5, help="Amount of runs, of which the fastest is reported (default: 5)")
+    run_parser.add_argument("--save", help="Write the results as JSON to this file")
+    run_parser.add_argument("--baseline", help="Fail if throughput dropped compared to these saved results")
+    run_parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop relative to the baseline (default: 0.2)")
+
+    for subparser in (generate_parser, run_parser):
+        subparser.add_argument("--files", type=int, default=200, help="Amount of generated TAS files (default: 200)")
+        subparser.add_argument("--lines", type=int, default=1000, help="Amount of lines per generated TAS file (default: 1000)")
+        subparser.add_argument("--grab-density", type=float, default=0.02, help="Fraction of generated lines with '4,D,X' patterns (default: 0.02)")
+        subparser.add_argument("--versions", type=int, default=50, help="Amount of versions in the generated CHANGELOG.md (default: 50)")
+        subparser.add_argument("--seed", type=int, default=0, help="Seed of the generator (default: 0)")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate_corpus(args.output, args.files, args.lines, args.grab_density, args.versions, args.seed)
+        return
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths, changelog_file = args.paths, args.changelog
+        if not paths or not changelog_file:
+            generate_corpus(corpus_dir, args.files, args.lines, args.grab_density, args.versions, args.seed)
+            paths = paths or [corpus_dir]
+            changelog_file = changelog_file or os.path.join(corpus_dir, "CHANGELOG.md")
+
+        files = zconvert.find_files(paths, recursive=True)
+        if not files:
+            print("No TAS files found", file=sys.stderr)
+            sys.exit(1)
+
+        results = benchmark_tas(files, args.repeat) + benchmark_changelog(changelog_file, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=4)
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Iterator
+
+# Constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+event_header = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """Watches directories for written / moved-in files using inotify (Linux only)"""
+
+    def __init__(self, directories: list[str], recursive: bool, extension: str):
+        self.recursive = recursive
+        self.extension = extension
+        self.watches: dict[int, str] = {}
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        for directory in directories:
+            self._add_watch(directory)
+
+    def _add_watch(self, directory: str):
+        directories = [directory]
+        if self.recursive:
+            for root, dirs, _ in os.walk(directory):
+                # Skip hidden directories (.git, etc.)
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                directories += [os.path.join(root, d) for d in dirs]
+
+        for path in directories:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, "Too many inotify watches, increase fs.inotify.max_user_watches")
+                continue # Directory was probably removed again
+            self.watches[wd] = path
+
+    def _read_events(self) -> set[str]:
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = event_header.unpack_from(data, offset)
+            offset += event_header.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                print("Warning: inotify event queue overflowed, some changes might have been missed", file=sys.stderr, flush=True)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith('.'):
+                    self._add_watch(path)
+                continue
+
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and name.endswith(self.extension):
+                changed.add(path)
+
+        return changed
+
+    def changes(self, debounce: float) -> Iterator[set[str]]:
+        while True:
+            select.select([self.fd], [], [])
+            changed = self._read_events()
+
+            # Wait until no more events arrive, since editors tend to save in multiple steps
+            while select.select([self.fd], [], [], debounce)[0]:
+                changed |= self._read_events()
+
+            if changed:
+                yield changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Fallback for platforms without inotify, which periodically compares modification times"""
+
+    def __init__(self, directories: list[str], recursive: bool, extension: str, interval: float = 0.5):
+        self.directories = directories
+        self.recursive = recursive
+        self.extension = extension
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        pending = list(self.directories)
+        while pending:
+            try:
+                entries = list(os.scandir(pending.pop()))
+            except OSError:
+                continue
+
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive and not entry.name.startswith('.'):
+                        pending.append(entry.path)
+                elif entry.name.endswith(self.extension):
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _diff(self) -> set[str]:
+        snapshot = self._scan()
+        changed = { path for path, state in snapshot.items() if self.snapshot.get(path) != state }
+        self.snapshot = snapshot
+        return changed
+
+    def changes(self, debounce: float) -> Iterator[set[str]]:
+        while True:
+            time.sleep(self.interval)
+            changed = self._diff()
+            if not changed:
+                continue
+
+            # Wait until no more files change, since editors tend to save in multiple steps
+            while True:
+                time.sleep(debounce)
+                more = self._diff()
+                if not more:
+                    break
+                changed |= more
+
+            yield changed
+
+    def close(self):
+        pass
+
+def create_watcher(directories: list[str], recursive: bool, extension: str = ".tas", polling: bool = False):
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories, recursive, extension)
+        except (OSError, AttributeError) as e:
+            print(f"Failed to setup inotify, falling back to polling: {e}", file=sys.stderr, flush=True)
+
+    return PollingWatcher(directories, recursive, extension)
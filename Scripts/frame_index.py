@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import base64
+import hashlib
+import argparse
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Optional
+
+from zconvert import find_files
+from action_line import ActionLine
+from tas_files import parse_command_line, find_read_target_file, get_line_target
+
+# Bump whenever the indexing changes, to invalidate cached indices
+INDEX_VERSION = 1
+
+# Celeste advances its timers by 0.017s per frame
+FRAME_TIME = 0.017
+
+# Needs to be kept in sync with RepeatCommand.cs
+MAX_REPEAT_COUNT = 10_000_000
+
+@dataclass
+class FrameIndex:
+    path: str
+    content_hash: str
+
+    # Frame at which each line starts, followed by the total frame count
+    line_starts: array = field(default_factory=lambda: array('q'))
+    # Index of 'EndRepeat' lines -> index of the first repeated line and frame count of a single repetition
+    repeats: dict[int, tuple[int, int]] = field(default_factory=dict)
+    # Index of 'Read' lines -> target file and index of its first read line
+    reads: dict[int, tuple[str, int]] = field(default_factory=dict)
+    # Content hashes of all files which were (transitively) read
+    dependencies: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def total_frames(self) -> int:
+        return self.line_starts[-1]
+
+    def frames_between(self, start_line: int, end_line: int) -> int:
+        """Frame count of the 1-indexed, inclusive line range"""
+        start_line = min(max(start_line, 1), len(self.line_starts))
+        end_line = min(max(end_line, start_line - 1), len(self.line_starts) - 1)
+        return self.line_starts[end_line] - self.line_starts[start_line - 1]
+
+    def line_at_frame(self, frame: int) -> Optional[int]:
+        """1-indexed line inside this file, which is responsible for the 0-indexed frame"""
+        if frame < 0 or frame >= self.total_frames:
+            return None
+
+        line = bisect_right(self.line_starts, frame) - 1
+        if line in self.repeats:
+            # Later repetitions are attributed to the repeated lines
+            block_start, block_frames = self.repeats[line]
+            frame = self.line_starts[block_start] + (frame - self.line_starts[line]) % block_frames
+            line = bisect_right(self.line_starts, frame) - 1
+
+        return line + 1
+
+    def as_dict(self):
+        return {
+            "version": INDEX_VERSION,
+            "hash": self.content_hash,
+            "lineStarts": base64.b64encode(self.line_starts.tobytes()).decode(),
+            "repeats": {str(line): value for line, value in self.repeats.items()},
+            "reads": {str(line): value for line, value in self.reads.items()},
+            "dependencies": self.dependencies,
+        }
+
+    @staticmethod
+    def from_dict(path, data):
+        line_starts = array('q')
+        line_starts.frombytes(base64.b64decode(data["lineStarts"]))
+        return FrameIndex(
+            path=path,
+            content_hash=data["hash"],
+            line_starts=line_starts,
+            repeats={int(line): tuple(value) for line, value in data["repeats"].items()},
+            reads={int(line): tuple(value) for line, value in data["reads"].items()},
+            dependencies=data["dependencies"],
+        )
+
+class FrameIndexer:
+    """Builds frame indices of TAS files, expanding 'Repeat' and 'Read' commands like InputController.ReadLines"""
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path
+        self.indices: dict[str, FrameIndex] = {}
+        self.hashes: dict[str, str] = {}
+        self.errors: list[str] = []
+
+        self.cached = {}
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r') as f:
+                    self.cached = json.load(f)
+            except (OSError, ValueError):
+                print(f"Ignoring invalid cache file '{cache_path}'", flush=True)
+
+    def save(self):
+        if not self.cache_path:
+            return
+        self.cached |= { path: index.as_dict() for path, index in self.indices.items() }
+        with open(self.cache_path, 'w') as f:
+            json.dump(self.cached, f)
+
+    def content_hash(self, path: str) -> str:
+        if path not in self.hashes:
+            with open(path, 'rb') as f:
+                self.hashes[path] = hashlib.sha256(f.read()).hexdigest()
+        return self.hashes[path]
+
+    def index(self, path: str, read_stack: tuple[str, ...] = ()) -> FrameIndex:
+        path = os.path.abspath(path)
+        if path in self.indices:
+            return self.indices[path]
+
+        cached = self.cached.get(path)
+        if cached and cached["version"] == INDEX_VERSION and cached["hash"] == self.content_hash(path) and \
+           all(os.path.exists(dependency) and self.content_hash(dependency) == dependency_hash for dependency, dependency_hash in cached["dependencies"].items()):
+            index = FrameIndex.from_dict(path, cached)
+            self.indices[path] = index
+            # Included files are only loaded on demand, for example when locating a frame inside them
+            return index
+
+        index = self._build(path, read_stack + (path,))
+        self.indices[path] = index
+        return index
+
+    def _build(self, path: str, read_stack: tuple[str, ...]) -> FrameIndex:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+        index = FrameIndex(path, self.content_hash(path))
+        line_starts = index.line_starts
+        file_directory = os.path.dirname(path)
+
+        frames = 0
+        repeat_stack = []
+        for line_index, line in enumerate(lines):
+            line_starts.append(frames)
+
+            text = line.strip()
+            if not text or text[0] == '#' or text.startswith("***"):
+                continue # Comments, labels and breakpoints
+
+            command_line = parse_command_line(text)
+            if not command_line:
+                action_line = ActionLine.parse(text)
+                if action_line:
+                    frames += action_line.frame_count
+                continue
+
+            args = command_line.arguments
+            error_prefix = f"{path} line {line_index + 1}"
+            if command_line.is_command("Read") and len(args) > 0:
+                target, error_message = find_read_target_file(file_directory, args[0])
+                if not target:
+                    self.errors.append(f"{error_prefix}: {error_message}")
+                    continue
+
+                target = os.path.abspath(target)
+                if target in read_stack:
+                    self.errors.append(f"{error_prefix}: Multiple read commands lead to dead loops")
+                    continue
+
+                target_index = self.index(target, read_stack)
+                with open(target, 'r', encoding='utf-8') as f:
+                    target_lines = f.read().splitlines()
+
+                start_line = get_line_target(args[1], target_lines) if len(args) > 1 else 1
+                end_line = get_line_target(args[2], target_lines) if len(args) > 2 else len(target_lines)
+                if start_line is None or end_line is None:
+                    self.errors.append(f"{error_prefix}: {args[1] if start_line is None else args[2]} is invalid")
+                    continue
+
+                frames += target_index.frames_between(start_line, end_line)
+                index.reads[line_index] = (target, max(start_line, 1) - 1)
+                index.dependencies[target] = target_index.content_hash
+                index.dependencies |= target_index.dependencies
+
+            elif command_line.is_command("Repeat") and len(args) > 0:
+                try:
+                    count = int(args[0])
+                except ValueError:
+                    self.errors.append(f"{error_prefix}: Repeat command's count is not an integer")
+                    continue
+                repeat_stack.append((line_index, min(max(count, 1), MAX_REPEAT_COUNT), frames))
+
+            elif command_line.is_command("EndRepeat"):
+                if not repeat_stack:
+                    self.errors.append(f"{error_prefix}: EndRepeat command does not have a paired Repeat command")
+                    continue
+
+                start_index, count, start_frames = repeat_stack.pop()
+                block_frames = frames - start_frames
+                if count > 1 and block_frames > 0:
+                    frames += block_frames * (count - 1)
+                    index.repeats[line_index] = (start_index + 1, block_frames)
+
+            elif command_line.is_command("Play"):
+                # Reading the current file stops after a 'Play' command
+                line_starts.extend([frames] * (len(lines) - line_index - 1))
+                break
+
+        for start_index, _, _ in repeat_stack:
+            self.errors.append(f"{path} line {start_index + 1}: Repeat command does not have a paired EndRepeat command")
+
+        line_starts.append(frames)
+        return index
+
+    def locate(self, path: str, frame: int) -> Optional[list[tuple[str, int]]]:
+        """Resolves the 0-indexed frame to the chain of (file, 1-indexed line) through all 'Read' commands"""
+        index = self.index(path)
+        chain = []
+        while True:
+            line = index.line_at_frame(frame)
+            if line is None:
+                return None
+            chain.append((index.path, line))
+
+            if line - 1 not in index.reads:
+                return chain
+
+            target, target_start = index.reads[line - 1]
+            target_index = self.index(target)
+            frame = frame - index.line_starts[line - 1] + target_index.line_starts[target_start]
+            index = target_index
+
+def format_frames(frames: int) -> str:
+    seconds = frames * FRAME_TIME
+    return f"{int(seconds // 60)}:{seconds % 60:06.3f} ({frames} frames)"
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexes the frame counts of TAS files")
+    parser.add_argument("paths", nargs="*", default=["."], help="TAS files or directories to index (default: current directory)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Search directories recursively for TAS files")
+    parser.add_argument("-f", "--frame", type=int, help="Find the line which is responsible for the (0-indexed) frame in each file")
+    parser.add_argument("--cache", default=".frame-index-cache.json", help="Cache of already indexed files (default: .frame-index-cache.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Index all files, ignoring and not updating the cache")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    indexer = FrameIndexer(None if args.no_cache else args.cache)
+
+    total_frames = 0
+    for filepath in find_files(args.paths, args.recursive):
+        index = indexer.index(filepath)
+        total_frames += index.total_frames
+
+        if args.frame is None:
+            print(f"{filepath}: {format_frames(index.total_frames)}", flush=True)
+            continue
+
+        chain = indexer.locate(filepath, args.frame)
+        if chain is None:
+            print(f"{filepath}: Frame {args.frame} is out of range ({index.total_frames} frames)", flush=True)
+        else:
+            print(f"{filepath}: {' -> '.join(f'{os.path.relpath(path)}:{line}' for path, line in chain)}", flush=True)
+
+    indexer.save()
+
+    for error in indexer.errors:
+        print(f"Warning: {error}", file=sys.stderr, flush=True)
+    print(f"Total: {format_frames(total_frames)}, indexed in {time.perf_counter() - start_time:.2f}s", flush=True)
+
+if __name__ == "__main__":
+    main()
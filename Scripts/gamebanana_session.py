@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import tempfile
+from typing import Optional
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+# Cached sessions are discarded after this many seconds, even if the cookies themselves didn't expire yet
+SESSION_MAX_AGE = 7 * 24 * 60 * 60
+
+class SessionCache:
+    """
+    Encrypted on-disk cache of the browser's session cookies, so that subsequent runs can skip logging in.
+    The key is derived from a dedicated secret, which is never stored itself. It mustn't be the account password,
+    since anyone with the encrypted file could then guess the password offline.
+    """
+
+    def __init__(self, path: str, secret: str):
+        if not secret:
+            raise ValueError("The session cache requires a secret")
+        self.path = path
+        self.secret = secret
+
+    @staticmethod
+    def is_supported() -> bool:
+        return Fernet is not None
+
+    def _fernet(self, salt: bytes) -> "Fernet":
+        key = hashlib.pbkdf2_hmac("sha256", self.secret.encode(), salt, 600_000)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def load(self) -> Optional[list[dict]]:
+        """Cookies of the cached session, as returned by 'driver.get_cookies()', or None if there is no usable session"""
+        try:
+            with open(self.path, "r") as f:
+                entry = json.load(f)
+            cookies = json.loads(self._fernet(base64.b64decode(entry["salt"])).decrypt(entry["token"], ttl=SESSION_MAX_AGE))
+        except (OSError, ValueError, KeyError, InvalidToken):
+            # Missing, corrupted, too old or encrypted with another secret
+            return None
+
+        # Session cookies don't have an expiry
+        now = time.time()
+        if any(cookie.get("expiry") is not None and cookie["expiry"] <= now for cookie in cookies):
+            return None
+        return cookies
+
+    def save(self, cookies: list[dict]):
+        salt = os.urandom(16)
+        token = self._fernet(salt).encrypt(json.dumps(cookies).encode()).decode()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, prefix=".tmp-", delete=False) as f:
+            json.dump({ "salt": base64.b64encode(salt).decode(), "token": token }, f)
+        os.chmod(f.name, 0o600)
+        os.replace(f.name, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def get_session_cache() -> Optional[SessionCache]:
+    """Session cache at GAMEBANANA_SESSION_CACHE, which is only used with a GAMEBANANA_SESSION_KEY"""
+    cache_path = os.getenv("GAMEBANANA_SESSION_CACHE", ".gamebanana-session")
+    if not cache_path:
+        return None
+    # A dedicated key is required, since the encrypted cache would otherwise allow guessing the password offline
+    session_key = os.getenv("GAMEBANANA_SESSION_KEY")
+    if not session_key:
+        print("GAMEBANANA_SESSION_KEY isn't set, not caching the session", flush=True)
+        return None
+    if not SessionCache.is_supported():
+        print("'cryptography' isn't installed, not caching the session", flush=True)
+        return None
+    return SessionCache(cache_path, session_key)
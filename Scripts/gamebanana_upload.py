@@ -7,17 +7,75 @@ import hmac
 import hashlib
 import base64
 import struct
+import threading
 import urllib.parse
+from typing import Optional
+from contextlib import contextmanager
 from dataclasses import dataclass
-from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.firefox.options import Options
+from tracing import tracer, span
+from gamebanana_session import SessionCache, get_session_cache
 
 # Common User-Agent to pretent to be a real user
 user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
 
+# Maximum amount of files GameBanana allows per submission
+MAX_FILES = 20
+
+login_url = "https://gamebanana.com/members/account/login"
+
+# Maximum time (in seconds) to wait for the page to be ready / the file upload to be processed
+page_timeout = float(os.getenv("GAMEBANANA_PAGE_TIMEOUT", 30))
+upload_timeout = float(os.getenv("GAMEBANANA_UPLOAD_TIMEOUT", 120))
+# Maximum time (in seconds) to wait for the redirect after submitting an edit
+submit_timeout = float(os.getenv("GAMEBANANA_SUBMIT_TIMEOUT", 15))
+# Maximum time (in seconds) for the edit page to load with a cached session, before logging in again
+session_check_timeout = float(os.getenv("GAMEBANANA_SESSION_CHECK_TIMEOUT", 10))
+
+# The uploaded file is downloaded again in chunks of this size for verifying it
+download_chunk_size = 1024 * 1024
+
+@dataclass
+class Target:
+    item_type: str # 'Tool' or 'Mod'
+    item_id: str
+
+    @property
+    def is_tool(self) -> bool:
+        return self.item_type == "Tool"
+
+    @property
+    def edit_url(self) -> str:
+        return f"https://gamebanana.com/{"tools" if self.is_tool else "mods"}/edit/{self.item_id}"
+
+    def __str__(self):
+        return f"{self.item_type} {self.item_id}"
+
+@dataclass
+class TargetResult:
+    target: Target
+    # 'published' or 'failed'
+    status: str
+    duration: float
+    file_id: Optional[str] = None
+    error: Optional[str] = None
+
+def get_targets() -> list[Target]:
+    """
+    Submissions to publish to, from GAMEBANANA_TARGETS as comma-separated 'tool:<id>' / 'mod:<id>' entries.
+    Defaults to the single submission of GAMEBANANA_MODID / GAMEBANANA_ISTOOL.
+    """
+    targets_env = os.getenv("GAMEBANANA_TARGETS")
+    if not targets_env:
+        return [Target("Tool" if os.getenv('GAMEBANANA_ISTOOL') == "1" else "Mod", os.getenv('GAMEBANANA_MODID'))]
+
+    targets = []
+    for entry in targets_env.split(","):
+        item_type, item_id = entry.strip().split(":")
+        if item_type.lower() not in ("tool", "mod"):
+            raise ValueError(f"Invalid GameBanana target '{entry}'")
+        targets.append(Target(item_type.capitalize(), item_id))
+    return targets
+
 def main():
     file_path = sys.argv[1]
     update_json_path = sys.argv[2]
@@ -34,146 +92,329 @@ def main():
         celestetas_version = lines[0].strip()
         studio_version = lines[1].strip()
 
-    # Setup browser
-    options = Options()
-    options.add_argument("--headless")
-
-    profile = webdriver.FirefoxProfile()
-    profile.set_preference("general.useragent.override", user_agent)
-
-    driver = webdriver.Firefox(options=options)
-
-    # Login
-    driver.get("https://gamebanana.com/members/account/login")
-    driver.implicitly_wait(5)
-    time.sleep(5)
-
-    # Remove cookie banner
-    print("Removing cookie banner...", end="    ", flush=True)
-    driver.execute_script("$('.fc-consent-root').remove()")
-    print("Done", flush=True)
-    driver.implicitly_wait(1)
-    time.sleep(1)
-
-    print("Performing username + password login...", end="    ", flush=True)
-    driver.find_element(By.ID, "_sUsername").click()
-    driver.find_element(By.ID, "_sUsername").send_keys(os.getenv("GAMEBANANA_USERNAME"))
-    driver.find_element(By.ID, "_sPassword").click()
-    driver.find_element(By.ID, "_sPassword").send_keys(os.getenv("GAMEBANANA_PASSWORD"))
-    driver.execute_script("$('#UsernameLoginForm button').click()")
-    print("Done", flush=True)
-
-    driver.implicitly_wait(5)
-    time.sleep(5)
-
-    # Enter 2FA code if needed
-    if driver.current_url == "https://gamebanana.com/members/account/login":
-        print("Entering 2FA code...", end="    ", flush=True)
-        driver.find_element(By.ID, "_nTotp").send_keys(compute_twofac_code(os.getenv("GAMEBANANA_2FA_URI")))
-        print("Done", flush=True)
-
-        driver.implicitly_wait(5)
-        time.sleep(5)
-    else:
-        print(f"2FA not needed")
-
-    is_tool = os.getenv('GAMEBANANA_ISTOOL') == "1"
-
-    driver.get(f"https://gamebanana.com/{"tools" if is_tool else "mods"}/edit/{os.getenv('GAMEBANANA_MODID')}")
-    driver.implicitly_wait(5)
-    time.sleep(5)
-
-    # Check exiting file count
-    beforeFileCount = driver.execute_script("return $(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li\").length")
-
-    if beforeFileCount >= 20:
-        print("Deleting oldest file...", end="    ", flush=True)
-        # Need to delete oldest file to have enough space
-        driver.execute_script("$(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:last button\").click()")
-
-        wait = WebDriverWait(driver, timeout=2)
-        alert = wait.until(lambda d : d.switch_to.alert)
-        alert.accept()
-
-        print("Done.", flush=True)
-        driver.implicitly_wait(1)
-        time.sleep(1)
-
-    # Archive old files
-    print("Archiving old files...", end="    ", flush=True)
-    driver.execute_script("$(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li .ArchivedInput\").each((_, e) => e.checked = true)")
-    print("Done.", flush=True)
-    driver.implicitly_wait(1)
-    time.sleep(1)
-
-    # Upload file
-    print("Uploading new file...", end="    ", flush=True)
-    driver.find_element(By.CSS_SELECTOR, "fieldset#Files input[id$='_FileInput']").send_keys(os.path.join(os.getcwd(), file_path))
-    wait = WebDriverWait(driver, timeout=15, poll_frequency=.2)
-    wait.until(lambda d : beforeFileCount != driver.execute_script("$(\"return fieldset[id='Files'] ul[id$='_UploadedFiles'] li\").length"))
-    print("Done.", flush=True)
-    driver.implicitly_wait(5)
-    time.sleep(5)
-
-    # Reorder to be the topmost
-    print("Reordering new file to the top...", end="    ", flush=True)
-    driver.execute_script("$(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:last\").prependTo(\"fieldset[id='Files'] ul[id$='_UploadedFiles']\")")
-    print("Done.", flush=True)
-    driver.implicitly_wait(1)
-    time.sleep(1)
-
-    # Add description
-    print("Adding description to file...", end="    ", flush=True)
-    desc = f"CelesteTAS v{celestetas_version}, Studio v{studio_version}"
-    driver.execute_script(f"$(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:first .VersionInput\")[0].value = '{desc}'")
+    targets = get_targets()
+    results = []
+    browser = None
+    try:
+        browser = Browser()
+        browser.login(targets[0])
+        for target in targets:
+            print(f"Publishing to {target}", flush=True)
+            start_time = time.perf_counter()
+            try:
+                file_id = upload_selenium(browser, file_path, update_json, celestetas_version, studio_version, target)
+                results.append(TargetResult(target, "published", time.perf_counter() - start_time, file_id))
+            except Exception as e:
+                # Other targets are still published, before failing the release
+                print(f"Publishing to {target} failed: {e}", flush=True)
+                results.append(TargetResult(target, "failed", time.perf_counter() - start_time, error=str(e)))
+    finally:
+        if browser:
+            browser.quit()
+        tracer.finish()
+
+    print_results(results)
+    if any(result.status != "published" for result in results):
+        sys.exit(1)
+
+class PublishError(RuntimeError):
+    """Publishing the release to a target failed"""
+
+class UploadVerificationError(PublishError):
+    """The file served by GameBanana doesn't match the release file"""
+
+def print_results(results: list[TargetResult]):
+    print(f"{'Target':<16} {'Result':<10} {'Time':>8} {'File':>10}  Error", flush=True)
+    for result in results:
+        file_id = result.file_id if result.file_id is not None else "-"
+        print(f"{str(result.target):<16} {result.status:<10} {result.duration:>7.2f}s {file_id:>10}  {result.error or ''}", flush=True)
+
+class Browser:
+    """
+    Headless Firefox, which is logged in once and shared by all targets.
+    Every target has its own tab, so that its edit page stays open between steps. Since the driver only
+    controls one tab at a time, it's locked while a target uses it and targets are published one after another.
+    """
+
+    def __init__(self):
+        from selenium import webdriver
+        from selenium.webdriver.support.wait import WebDriverWait
+        from selenium.webdriver.firefox.options import Options
+
+        # Setup browser
+        options = Options()
+        options.add_argument("--headless")
+
+        profile = webdriver.FirefoxProfile()
+        profile.set_preference("general.useragent.override", user_agent)
+
+        with span("browser start"):
+            self.driver = webdriver.Firefox(options=options)
+            self.driver.set_script_timeout(page_timeout)
+        self.wait = WebDriverWait(self.driver, timeout=page_timeout, poll_frequency=.2)
+
+        self.lock = threading.RLock()
+        # Target -> window handle of its tab
+        self.tabs: dict[str, str] = {}
+
+    @contextmanager
+    def tab(self, target: Target):
+        """Switches to the tab of the target, which is opened if needed, and keeps the driver locked"""
+        with self.lock:
+            handle = self.tabs.get(str(target))
+            if handle is None:
+                # The first target uses the initial tab
+                if self.tabs:
+                    self.driver.switch_to.new_window("tab")
+                handle = self.tabs[str(target)] = self.driver.current_window_handle
+            self.driver.switch_to.window(handle)
+            yield self.driver
+
+    def login(self, target: Target):
+        """Logs in from the tab of the target. Its edit page is only available while logged in, so it also checks the cached session"""
+        with self.tab(target) as driver:
+            session_cache = get_session_cache()
+            if not (session_cache and restore_session(driver, session_cache, target.edit_url)):
+                login(driver, self.wait)
+                if session_cache:
+                    session_cache.save(driver.get_cookies())
+
+    def quit(self):
+        self.driver.quit()
+
+def upload_selenium(browser: Browser, file_path: str, update_json: list, celestetas_version: str, studio_version: str, target: Target) -> str:
+    """Publishes the release to the target with the logged-in browser, returning the ID of the new file"""
+    file_id = upload_file(browser, file_path, celestetas_version, studio_version, target)
+    publish_update(browser, file_id, file_md5(file_path), update_json, celestetas_version, studio_version, target)
+    return file_id
+
+def upload_file(browser: Browser, file_path: str, celestetas_version: str, studio_version: str, target: Target) -> str:
+    """
+    Uploads the release file on the edit page of the target and archives the old files, returning the ID of the new file.
+    The edit isn't submitted yet, so it stays in the tab of the target until publish_update()
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    wait = browser.wait
+    with browser.tab(target) as driver:
+        with span("open edit page"):
+            # Already open after checking the cached session
+            if driver.current_url != target.edit_url:
+                driver.get(target.edit_url)
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "fieldset#Files input[id$='_FileInput']")))
+            wait.until(lambda d : d.execute_script("return typeof $ !== 'undefined'"))
+
+        # Check exiting file count
+        beforeFileCount = count_uploaded_files(driver)
+
+        with span("archive files"):
+            if beforeFileCount >= MAX_FILES:
+                print("Deleting oldest file...", end="    ", flush=True)
+                # Need to delete oldest file to have enough space
+                driver.execute_script("$(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:last button\").click()")
+
+                alert = wait.until(EC.alert_is_present())
+                alert.accept()
+                wait.until(lambda d : count_uploaded_files(d) < beforeFileCount)
+                beforeFileCount = count_uploaded_files(driver)
+
+                print("Done.", flush=True)
+
+            # Archive old files
+            print("Archiving old files...", end="    ", flush=True)
+            driver.execute_script("$(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li .ArchivedInput\").each((_, e) => e.checked = true)")
+            print("Done.", flush=True)
+
+        with span("file upload"):
+            # Upload file
+            print("Uploading new file...", end="    ", flush=True)
+            driver.find_element(By.CSS_SELECTOR, "fieldset#Files input[id$='_FileInput']").send_keys(os.path.join(os.getcwd(), file_path))
+            upload_wait = WebDriverWait(driver, timeout=upload_timeout, poll_frequency=.2)
+            upload_wait.until(lambda d : count_uploaded_files(d) != beforeFileCount)
+            # The file row ID is only assigned once GameBanana accepted the upload
+            upload_wait.until(lambda d : d.execute_script("return $(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:last input[name='_idFileRow']\").val()"))
+            print("Done.", flush=True)
+
+            # Reorder to be the topmost
+            print("Reordering new file to the top...", end="    ", flush=True)
+            driver.execute_script("$(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:last\").prependTo(\"fieldset[id='Files'] ul[id$='_UploadedFiles']\")")
+            print("Done.", flush=True)
+
+            # Add description
+            print("Adding description to file...", end="    ", flush=True)
+            desc = f"CelesteTAS v{celestetas_version}, Studio v{studio_version}"
+            driver.execute_script(f"$(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:first .VersionInput\")[0].value = '{desc}'")
+            print("Done.", flush=True)
+
+            # Store file ID
+            file_id = driver.execute_script(f"return $(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:first input[name='_idFileRow']\")[0].value")
+
+        return file_id
+
+def publish_update(browser: Browser, file_id: str, md5: str, update_json: list, celestetas_version: str, studio_version: str, target: Target):
+    """Submits the edit which was prepared by upload_file(), verifies the new file and posts the update"""
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support import expected_conditions as EC
+
+    with browser.tab(target) as driver:
+        is_tool = target.is_tool
+
+        with span("submit edit"):
+            # Submit edit
+            print("Submitting edit...", end="    ", flush=True)
+            driver.execute_script("$('.Submit > button').click()")
+            # GameBanana redirects to the submission page once the edit is saved.
+            # If that doesn't happen, this still waited as long as the fixed delay which was used before
+            submission_url_regex = rf"^https://gamebanana\.com/{"tools" if is_tool else "mods"}/{target.item_id}(?:[/?#]|$)"
+            try:
+                WebDriverWait(driver, timeout=submit_timeout, poll_frequency=.2).until(EC.url_matches(submission_url_regex))
+                print("Done.", flush=True)
+            except TimeoutException:
+                print(f"Not redirected to the submission page (still on {driver.current_url}), continuing anyway", flush=True)
+
+        with span("verify upload"):
+            # A broken file is only added to the submission, but not announced with an update
+            verify_upload(file_id, md5, driver.get_cookies())
+
+        with span("update post"):
+            # Add update
+            print("Adding update...", end="    ", flush=True)
+
+            # The last argument of an async script is the callback for its result
+            status = driver.execute_async_script(f"""
+                                    const done = arguments[arguments.length - 1];
+                                    fetch("https://gamebanana.com/apiv11/{"Tool" if is_tool else "Mod"}/{target.item_id}/Update", {{
+                                       "credentials": "include",
+                                       "headers": {{
+                                           "Accept": "application/json, text/plain, */*",
+                                           "Accept-Language": "en,en-US;q=0.5",
+                                           "Content-Type": "application/json",
+                                           "Sec-Fetch-Dest": "empty",
+                                           "Sec-Fetch-Mode": "cors",
+                                           "Sec-Fetch-Site": "same-origin",
+                                           "Sec-GPC": "1",
+                                           "Priority": "u=0"
+                                       }},
+                                       "referrer": "https://gamebanana.com/{"tools" if is_tool else "mods"}/{target.item_id}",
+                                       "body": '{json.dumps({
+                                           "_aChangeLog": update_json,
+                                           "_aFileRowIds": [file_id],
+                                           "_sName": f"CelesteTAS v{celestetas_version} / Studio v{studio_version}",
+                                           "_sVersion": f"v{celestetas_version}",
+                                        }).replace("\\", "\\\\").replace("'", "\\'")}',
+                                       "method": "POST",
+                                       "mode": "cors"
+                                   }}).then(res => done(res.status), err => done(String(err)));
+                                   """)
+
+            if status != 200:
+                print(f"Failed ({status})", flush=True)
+                raise PublishError(f"Adding the update to {target} failed ({status})")
+            print("Done.", flush=True)
+
+def file_md5(file_path: str, chunk_size=download_chunk_size) -> str:
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def verify_upload(file_id: str, md5: str, cookies: list[dict]):
+    """Downloads the uploaded file again and compares it to the release file. Only a mismatch is an error, not a failed download"""
+    print("Verifying uploaded file...", end="    ", flush=True)
+    downloaded = hashlib.md5()
+    try:
+        with requests.get(f"https://gamebanana.com/dl/{file_id}",
+                          headers={ "User-Agent": user_agent },
+                          cookies={ cookie["name"]: cookie["value"] for cookie in cookies },
+                          stream=True, timeout=page_timeout) as res:
+            res.raise_for_status()
+            # Anything but the file itself (e.g. a download page) can't be verified
+            if res.headers.get("Content-Type", "").startswith("text/html"):
+                print(f"Skipped (got a page instead of the file from {res.url})", flush=True)
+                return
+            for chunk in res.iter_content(chunk_size=download_chunk_size):
+                downloaded.update(chunk)
+    except requests.RequestException as e:
+        print(f"Skipped ({e})", flush=True)
+        return
+
+    if downloaded.hexdigest() != md5:
+        print("Failed", flush=True)
+        raise UploadVerificationError(f"Uploaded file {file_id} has MD5 '{downloaded.hexdigest()}' instead of '{md5}'")
     print("Done.", flush=True)
-    driver.implicitly_wait(1)
-    time.sleep(1)
 
-    # Store file ID
-    file_id = driver.execute_script(f"return $(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li:first input[name='_idFileRow']\")[0].value")
+def restore_session(driver, session_cache: SessionCache, check_url: str) -> bool:
+    """Adds the cached cookies to the browser, returning whether they are still logged in. The browser is left on 'check_url'"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.common.exceptions import WebDriverException
+    from selenium.webdriver.support import expected_conditions as EC
+
+    cookies = session_cache.load()
+    if not cookies:
+        return False
+
+    with span("restore session"):
+        print("Restoring cached session...", end="    ", flush=True)
+        try:
+            # Cookies can only be added for the domain of the current page
+            driver.get("https://gamebanana.com")
+            for cookie in cookies:
+                driver.add_cookie(cookie)
+
+            driver.get(check_url)
+            WebDriverWait(driver, timeout=session_check_timeout, poll_frequency=.2).until(EC.presence_of_element_located((By.CSS_SELECTOR, "fieldset#Files input[id$='_FileInput']")))
+            print("Done", flush=True)
+            return True
+        except WebDriverException:
+            # Timed out waiting for the edit page or couldn't add the cookies
+            print(f"Rejected (on {driver.current_url}), logging in again", flush=True)
+            driver.delete_all_cookies()
+            session_cache.clear()
+            return False
+
+def login(driver, wait):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    with span("login"):
+        # Login
+        driver.get(login_url)
+        wait.until(EC.element_to_be_clickable((By.ID, "_sUsername")))
+        wait.until(lambda d : d.execute_script("return typeof $ !== 'undefined'"))
+
+        # Remove cookie banner
+        print("Removing cookie banner...", end="    ", flush=True)
+        driver.execute_script("$('.fc-consent-root').remove()")
+        print("Done", flush=True)
 
-    # Submit edit
-    print("Submitting edit...", end="    ", flush=True)
-    driver.execute_script("$('.Submit > button').click()")
-    driver.implicitly_wait(15)
-    time.sleep(15)
-    print("Done.", flush=True)
+        print("Performing username + password login...", end="    ", flush=True)
+        driver.find_element(By.ID, "_sUsername").click()
+        driver.find_element(By.ID, "_sUsername").send_keys(os.getenv("GAMEBANANA_USERNAME"))
+        driver.find_element(By.ID, "_sPassword").click()
+        driver.find_element(By.ID, "_sPassword").send_keys(os.getenv("GAMEBANANA_PASSWORD"))
+        driver.execute_script("$('#UsernameLoginForm button').click()")
 
-    # Add update
-    print("Adding update...", end="    ", flush=True)
-
-    driver.execute_script(f"""
-                            fetch("https://gamebanana.com/apiv11/{"Tool" if is_tool else "Mod"}/{os.getenv('GAMEBANANA_MODID')}/Update", {{
-                               "credentials": "include",
-                               "headers": {{
-                                   "Accept": "application/json, text/plain, */*",
-                                   "Accept-Language": "en,en-US;q=0.5",
-                                   "Content-Type": "application/json",
-                                   "Sec-Fetch-Dest": "empty",
-                                   "Sec-Fetch-Mode": "cors",
-                                   "Sec-Fetch-Site": "same-origin",
-                                   "Sec-GPC": "1",
-                                   "Priority": "u=0"
-                               }},
-                               "referrer": "https://gamebanana.com/{"tools" if is_tool else "mods"}/{os.getenv('GAMEBANANA_MODID')}",
-                               "body": '{json.dumps({
-                                   "_aChangeLog": update_json,
-                                   "_aFileRowIds": [file_id],
-                                   "_sName": f"CelesteTAS v{celestetas_version} / Studio v{studio_version}",
-                                   "_sVersion": f"v{celestetas_version}",
-                                }).replace("\\", "\\\\").replace("'", "\\'")}',
-                               "method": "POST",
-                               "mode": "cors"
-                           }});
-                           """)
-
-    driver.implicitly_wait(5)
-    time.sleep(5)
-    print("Done.", flush=True)
+        # Either the login completes or the 2FA prompt shows up
+        wait.until(EC.any_of(EC.url_changes(login_url), EC.visibility_of_element_located((By.ID, "_nTotp"))))
+        print("Done", flush=True)
 
-    driver.quit()
+    with span("2fa"):
+        # Enter 2FA code if needed
+        if driver.current_url == login_url:
+            print("Entering 2FA code...", end="    ", flush=True)
+            driver.find_element(By.ID, "_nTotp").send_keys(compute_twofac_code(os.getenv("GAMEBANANA_2FA_URI")))
+            wait.until(EC.url_changes(login_url))
+            print("Done", flush=True)
+        else:
+            print(f"2FA not needed")
 
+def count_uploaded_files(driver) -> int:
+    return driver.execute_script("return $(\"fieldset[id='Files'] ul[id$='_UploadedFiles'] li\").length")
 
 def compute_twofac_code(uri: str) -> str:
     secret, period, digits, algorithm = parse_otpauth_uri(uri)
@@ -234,7 +475,8 @@ def get_totp_token(secret, time_step, digits=6, algorithm='SHA1'):
     # Get the last 'digits' digits of the number
     totp_token = truncated_hash % (10 ** digits)
 
-    return totp_token
+    # Leading zeros are part of the code
+    return str(totp_token).zfill(digits)
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,22 @@
+import io
 import os
 import sys
 import re
 import json
+import time
+import hashlib
+import argparse
 import requests
 import dataclasses
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from typing import Optional
 
+import git_history
+from tracing import tracer, span
+from github_api import GitHubClient
+from image_assets import ImagePipeline, ProcessedImage
+
 # from rich import print as print
 
 # Map entry in commit message to GameBanana update category / heading in release page
@@ -19,6 +29,15 @@ categories = {
     "optimize": ("Optimization", "Optimizations"),
 }
 
+# Bump whenever the parsing changes, to invalidate cached versions
+CHANGELOG_CACHE_VERSION = 1
+
+# Version headings need to mention both versions on the same line, in any order
+celestetas_heading_regex = re.compile(rb"CelesteTAS[^\S\n]+v([\d.]+)")
+studio_heading_regex = re.compile(rb"Studio[^\S\n]+v([\d.]+)")
+# Change entries take precedence over images on the same line
+entry_regex = re.compile(r"(?:.*?-\s+(?P<change_type>[a-zA-Z]+)\s*:\s*(?P<change_message>.+)|.*?<!-- IMAGE (?P<align>right|left) (?P<width>\d+) (?P<height>\d+) (?P<src>[\w/.]+) -->)")
+
 conventional_commit_types = {
     "feat": 'Features',
     "fix": 'Bug Fixes',
@@ -75,6 +94,13 @@ class Version:
 
     markdown_text: str = ""
 
+    @staticmethod
+    def from_cache(data):
+        version = Version(**data)
+        version.pages = [Page(page["text"], Image(**page["image"]) if page["image"] else None) for page in data["pages"]]
+        version.change_list = [tuple(change) for change in data["change_list"]]
+        return version
+
     def as_dict(self):
         return {
             "celesteTasVersion": self.celestetas_version,
@@ -100,11 +126,19 @@ class Commit:
     type: str
     scope: str
     message: str
-    author: str
+    # GitHub login of the author, or their plain name if it isn't linked to a GitHub user
+    author: Optional[str]
+    author_name: str
     pull_requests: list[PullRequest]
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        with span("batch"):
+            batch_main(sys.argv[2:])
+        tracer.finish()
+        return
+
     commit_message = sys.argv[1]
     changelog_file = sys.argv[2]
     version_info_file = sys.argv[3]
@@ -112,181 +146,376 @@ def main():
     gh_changelog_file = sys.argv[5]
     studio_changelog_file = sys.argv[6]
 
-    # Find CelesteTAS / Studio version
-    celestetas_version = re.search(r"CelesteTAS\s+v([\d.]+)", commit_message).group(1)
-    studio_version = re.search(r"Studio\s+v([\d.]+)", commit_message).group(1)
+    celestetas_version, studio_version = find_release_versions(commit_message)
     with open(version_info_file, "w") as f:
-        f.write(f"{celestetas_version.strip()}\n")
-        f.write(f"{studio_version.strip()}\n")
+        f.write(f"{celestetas_version}\n")
+        f.write(f"{studio_version}\n")
 
     # Parse CHANGELOG file
-    versions = []
-    with open(changelog_file, "r") as f:
-        current_version = None
-        current_page = None
-        while line := f.readline():
-            celestetas_match = re.search(r"CelesteTAS\s+v([\d.]+)", line)
-            studio_match = re.search(r"Studio\s+v([\d.]+)", line)
-            if celestetas_match and studio_match:
-                if current_version:
-                    versions.append(current_version)
-                current_version = Version(celestetas_match.group(1), studio_match.group(1))
-                print(current_version)
-                continue
-            elif not current_version:
-                continue
+    with span("changelog parse", file=changelog_file):
+        changelog = Changelog(changelog_file, os.getenv("CHANGELOG_CACHE", ".changelog-cache.json"))
 
-            change_match = re.search(r"-\s+([a-zA-Z]+)\s*:\s*(.+)", line)
-            image_match = re.search(r"<!-- IMAGE (right|left) (\d+) (\d+) ([\w/.]+) -->", line)
-            if change_match:
-                change_type, change_message = change_match.group(1).lower(), change_match.group(2).strip()
-                if change_type not in current_version.change_category:
-                    print(f"Invalid change type '{change_type}' with message '{change_message}'", flush=True)
-                    continue
-                current_version.change_list.append((change_type, change_message))
-                current_version.change_category[change_type].append(change_message)
-            elif image_match:
-                if not current_page:
-                    current_page = Page(text="")
-                current_page.image = Image(image_match.group(4), image_match.group(1), int(image_match.group(2)), int(image_match.group(3)))
-            elif current_page:
-                if line.startswith("---"):
-                    current_version.pages.append(current_page)
-                    current_page = None
-                else:
-                    current_page.text += line
-            elif line and line.strip():
-                current_page = Page(text=line)
+        # Only the released version is needed for the GameBanana / GitHub changelogs
+        version = changelog.find(celestetas_version, studio_version)
 
-        if current_page:
-            current_version.pages.append(current_page)
-        if current_version:
-            versions.append(current_version)
+    image_pipeline = ImagePipeline()
+
+    if version:
+        with span("render gamebanana"), open(gb_changelog_file, "w") as f:
+            f.write(json.dumps(render_gamebanana_changelog(version)))
 
-    for version in versions:
-        if version.celestetas_version != celestetas_version or version.studio_version != studio_version:
+        # Generate commit overview from the current to previous tag
+        gh_repo = os.getenv("GITHUB_REPO")
+        commit_overview = fetch_commit_overview(gh_repo, os.getenv("GITHUB_TOKEN"))
+        if commit_overview:
+            current_tag, parsed_commits = commit_overview
+            # Only the images of the released version are needed
+            with span("image pipeline", versions=1):
+                images = process_images([version], image_pipeline)
+            with span("render github"), open(gh_changelog_file, "w") as f:
+                f.write(render_github_changelog(version, gh_repo, current_tag["commit"]["sha"], parsed_commits, images))
+
+    # The full history is loaded from the cache, if the CHANGELOG file didn't change
+    versions = changelog.versions()
+    with span("image pipeline", versions=len(versions)):
+        images = process_images(versions, image_pipeline)
+    with span("render studio"):
+        with open(studio_changelog_file, "w") as f:
+            json.dump(render_studio_changelog(versions, images), f)
+        changelog.save()
+
+    tracer.finish()
+
+def find_release_versions(commit_message: str) -> tuple[str, str]:
+    """Find CelesteTAS / Studio version of the release commit"""
+    celestetas_version = re.search(r"CelesteTAS\s+v([\d.]+)", commit_message).group(1)
+    studio_version = re.search(r"Studio\s+v([\d.]+)", commit_message).group(1)
+    return celestetas_version.strip(), studio_version.strip()
+
+def batch_main(args: list[str]):
+    parser = argparse.ArgumentParser(prog="generate_changelog.py batch", description="Renders the release notes of all versions inside a CHANGELOG file")
+    parser.add_argument("changelog", help="CHANGELOG file to render")
+    parser.add_argument("output", help="Directory to write the release notes into, with one sub-directory per version")
+    parser.add_argument("--from", dest="from_version", help="Oldest CelesteTAS version to render (inclusive)")
+    parser.add_argument("--to", dest="to_version", help="Newest CelesteTAS version to render (inclusive)")
+    parser.add_argument("--repo", default=os.getenv("GITHUB_REPO", "EverestAPI/CelesteTAS-EverestInterop"), help="GitHub repository for image / pull request links")
+    parser.add_argument("--commits", action="store_true", help="Include commit details from the local git history, if the version is tagged")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Amount of parallel processes (default: CPU count)")
+    args = parser.parse_args(args)
+
+    start_time = time.perf_counter()
+    changelog = Changelog(args.changelog)
+
+    def version_key(version: str) -> tuple[int, ...]:
+        return tuple(int(part) for part in version.split(".") if part)
+
+    indices = [i for i, entry in enumerate(changelog.entries)
+               if (not args.from_version or version_key(entry.celestetas_version) >= version_key(args.from_version)) and
+                  (not args.to_version or version_key(entry.celestetas_version) <= version_key(args.to_version))]
+
+    # Only tags of the local history are used, since the requests of all versions would quickly run into the rate limit
+    tags = git_history.get_tags() if args.commits and git_history.is_available() else []
+
+    os.makedirs(args.output, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_batch_worker, initargs=(args.changelog,)) as executor:
+        versions = list(executor.map(render_batch_version, indices, [args.output] * len(indices), [args.repo] * len(indices), [tags] * len(indices)))
+
+    with open(os.path.join(args.output, "studio_changelog.json"), "w") as f:
+        json.dump(render_studio_changelog(versions), f)
+
+    print(f"Rendered {len(versions)} versions in {time.perf_counter() - start_time:.2f}s", flush=True)
+
+# Changelog of the worker process, which only parses the versions it renders
+batch_changelog: Optional["Changelog"] = None
+
+def init_batch_worker(changelog_file: str):
+    global batch_changelog
+    batch_changelog = Changelog(changelog_file)
+
+def render_batch_version(i: int, output_dir: str, gh_repo: str, tags: list[dict]) -> Version:
+    version = batch_changelog.load(i)
+    version_dir = os.path.join(output_dir, f"v{version.celestetas_version}")
+    os.makedirs(version_dir, exist_ok=True)
+
+    with open(os.path.join(version_dir, "gamebanana_changelog.json"), "w") as f:
+        f.write(json.dumps(render_gamebanana_changelog(version)))
+
+    # Release pages can reference images by tag, if the commit is unknown
+    ref, parsed_commits = f"v{version.celestetas_version}", None
+    tag_index = next((j for j, tag in enumerate(tags) if tag["name"] == ref), None)
+    if tag_index is not None and tag_index + 1 < len(tags):
+        ref = tags[tag_index]["commit"]["sha"]
+        commit_entries = git_history.get_commits(tags[tag_index + 1]["commit"]["sha"], ref, gh_repo)
+        parsed_commits = group_commits(commit_entries, {}, verbose=False)
+
+    with open(os.path.join(version_dir, "github_changelog.md"), "w") as f:
+        f.write(render_github_changelog(version, gh_repo, ref, parsed_commits))
+
+    return version
+
+def fetch_commit_overview(gh_repo: str, gh_token: Optional[str]) -> Optional[tuple[dict, dict[str, list[Commit]]]]:
+    """Returns the current tag and the commits since the previous tag, grouped by their type"""
+    client = GitHubClient(gh_repo, gh_token)
+
+    # The local history is preferred, with the API only being used to link pull requests / authors
+    use_git = os.getenv("CHANGELOG_SOURCE", "git") == "git" and git_history.is_available()
+    with span("tag fetch", source="git" if use_git else "api"):
+        if use_git:
+            tags = git_history.get_tags()
+        else:
+            res = client.get(f"repos/{gh_repo}/tags")
+            if res.status_code != 200:
+                print(f"Failed to fetch repository tags: {res.text}", flush=True)
+                return None
+            tags = res.json()
+
+    # Get previous and current tag
+    current_tag = tags[0]
+    previous_tag = tags[1]
+
+    source = "local history" if use_git else "GitHub API"
+    print(f"Generating changelog for releases {previous_tag["name"]} to {current_tag["name"]} from {source} ...", flush=True)
+
+    # Get commits between tags
+    with span("compare pages") as span_args:
+        if use_git:
+            commit_entries = git_history.get_commits(previous_tag["commit"]["sha"], current_tag["commit"]["sha"], gh_repo)
+        else:
+            commit_entries = client.get_all_pages(f"repos/{gh_repo}/compare/{previous_tag["commit"]["sha"]}...{current_tag["commit"]["sha"]}", key="commits")
+        span_args["commits"] = len(commit_entries)
+    print(f"Found {len(commit_entries)} commits", flush=True)
+
+    # Link associated pull requests, with a single request per batch of commits
+    commit_details = {}
+    if gh_token:
+        with span("pull request lookups"):
+            try:
+                commit_details = client.fetch_commit_details([commit_entry["sha"] for commit_entry in commit_entries if len(commit_entry["parents"]) == 1])
+            except requests.RequestException as e:
+                if not use_git:
+                    raise
+                print(f"Failed to fetch commit details, only using the local history: {e}", flush=True)
+    client.close()
+
+    with span("parse commits"):
+        return current_tag, group_commits(commit_entries, commit_details)
+
+def group_commits(commit_entries: list[dict], commit_details: dict[str, dict], verbose=True) -> dict[str, list[Commit]]:
+    parsed_commits: dict[str, list[Commit]] = {}
+    for commit_type in conventional_commit_types:
+        parsed_commits[commit_type] = []
+
+    for commit_entry in commit_entries:
+        details = commit_details.get(commit_entry["sha"])
+        if details and details["author"]:
+            commit_entry["author"] = { "login": details["author"] }
+
+        parsed_commit = parse_commit(commit_entry, details["pullRequests"] if details else commit_entry.get("pullRequests", []), verbose)
+        if parsed_commit:
+            parsed_commits[parsed_commit.type].append(parsed_commit)
+
+    return parsed_commits
+
+def process_images(versions: list[Version], pipeline: Optional[ImagePipeline] = None) -> dict[str, ProcessedImage]:
+    """Validates the images of the pages of the versions and produces their optimized variants"""
+    return (pipeline or ImagePipeline()).process_all((page.image.src, page.image.width, page.image.height) for version in versions for page in version.pages if page.image)
+
+def render_gamebanana_changelog(version: Version) -> list[dict]:
+    gb_changelog = []
+    for change_type, change_message in version.change_list:
+        # Entries have to be at least 10 characters, so lets cheat a bit with a ZWNBS
+        if len(change_message) < 10:
+            change_message = change_message.ljust(9) + "\ufeff"
+
+        # Replace ` with ' since GB doesn't support code blocks
+        gb_changelog.append({ "cat": categories[change_type][0], "text": change_message.replace('`', '\'') })
+    return gb_changelog
+
+def render_github_changelog(version: Version, gh_repo: str, ref: str, parsed_commits: Optional[dict[str, list[Commit]]], images: Optional[dict[str, ProcessedImage]] = None) -> str:
+    """Renders the GitHub release page, with images being loaded from the commit / tag 'ref'"""
+    gh_markdown = io.StringIO()
+    for page in version.pages:
+        if page.image:
+            # Optimized variants can only be used if they're part of the commit
+            processed = (images or {}).get(page.image.src)
+            src, width, height = page.image.src, page.image.width, page.image.height
+            if processed:
+                width, height = processed.width, processed.height
+                if processed.committed:
+                    src = processed.webp
+
+            gh_markdown.write(f"<img src=\"https://raw.githubusercontent.com/{gh_repo}/{ref}/{src}\" width=\"{width}\" height=\"{height}\" align=\"{page.image.align}\">\n")
+            gh_markdown.write(f"{page.text.strip()}\n<br clear=\"{page.image.align}\"/> <hr/>\n\n")
+        else:
+            gh_markdown.write(f"{page.text.strip()}\n\n---\n\n")
+
+    for category in version.change_category:
+        changes = version.change_category[category]
+        if len(changes) == 0:
             continue
 
-        # Generate GameBanana changelog
-        gb_changelog = []
-        for change_type, change_message in version.change_list:
-            # Entries have to be at least 10 characters, so lets cheat a bit with a ZWNBS
-            if len(change_message) < 10:
-                change_message = change_message.ljust(9) + "\ufeff"
+        gh_markdown.write(f"## {categories[category][1]}\n")
+        for change in changes:
+            gh_markdown.write(f"- {change}\n")
+        gh_markdown.write("\n")
 
-            # Replace ` with ' since GB doesn't support code blocks
-            gb_changelog.append({ "cat": categories[change_type][0], "text": change_message.replace('`', '\'') })
+    if parsed_commits is None:
+        return gh_markdown.getvalue()
 
-        with open(gb_changelog_file, "w") as f:
-            f.write(json.dumps(gb_changelog))
+    # Generate commit details
+    gh_markdown.write("<details>\n")
+    gh_markdown.write("<summary><h3>Commit Details</h3></summary>\n")
 
-        # Generate commit overview from the current to previous tag
-        gh_repo = os.getenv("GITHUB_REPO")
-        gh_token = os.getenv("GITHUB_TOKEN")
-
-        # Get previous and current tag
-        res = requests.request(
-            method="GET",
-            url=f"https://api.github.com/repos/{gh_repo}/tags",
-            headers={
-                "Authorization": f"Bearer {gh_token}"
-            },
-        )
-        if res.status_code != 200:
-            print(f"Failed to fetch repository tags: {res.text}", flush=True)
+    for commit_type in parsed_commits:
+        commits = parsed_commits[commit_type]
+        if len(commits) == 0:
             continue
 
-        res_json = res.json()
-
-        current_tag = res_json[0]
-        previous_tag = res_json[1]
-
-        print(f"Generating changelog for releases {previous_tag["name"]} to {current_tag["name"]} ...", flush=True)
-
-        # Get commits between tags
-        parsed_commits: dict[str, Commit] = {}
-        for commit_type in conventional_commit_types:
-            parsed_commits[commit_type] = []
-
-        next_url = None
-        while True:
-            res = requests.request(
-                method="GET",
-                url=f"https://api.github.com/repos/{gh_repo}/compare/{previous_tag["commit"]["sha"]}...{current_tag["commit"]["sha"]}"
-                    if next_url is None else
-                        next_url,
-                headers={
-                    "Authorization": f"Bearer {gh_token}"
-                },
-                params = {
-                    # The docs say the maximum is 100, however this doesnt appear to be the case
-                    "per_page": 1000
-                }
-            )
-            res_json = res.json()
-
-            for commit_entry in res_json["commits"]:
-                parsed_commit = parse_commit(commit_entry)
-                if parsed_commit:
-                    parsed_commits[parsed_commit.type].append(parsed_commit)
-
-            if "link" in res.headers and 'rel="next"' in res.headers["link"]:
-                next_url = re.search(r'(?<=<)([\S]*)(?=>; rel="Next")', res.headers["link"], re.IGNORECASE).group(0)
-            else:
-                break # No more pages left
-            break
-
-        # Convert to GitHub MarkDown
-        gh_markdown = ""
-        for page in version.pages:
-            if page.image:
-                gh_markdown += f"<img src=\"https://raw.githubusercontent.com/{gh_repo}/{current_tag["commit"]["sha"]}/{page.image.src}\" width=\"{page.image.width}\" height=\"{page.image.width}\" align=\"{page.image.align}\">\n"
-                gh_markdown += f"{page.text.strip()}\n<br clear=\"{page.image.align}\"/> <hr/>\n\n"
-            else:
-                gh_markdown += f"{page.text.strip()}\n\n---\n\n"
-
-        for category in version.change_category:
-            changes = version.change_category[category]
-            if len(changes) == 0:
-                continue
+        gh_markdown.write("\n")
+        gh_markdown.write(f"### {conventional_commit_types[commit_type]}\n")
+        for commit in commits:
+            prs = [f"[#{pull_request.id}]({pull_request.url})" for pull_request in commit.pull_requests]
+            scope = f"**{commit.scope}**: " if commit.scope else ""
+            author = f"@{commit.author}" if commit.author else commit.author_name
+            gh_markdown.write(f"- {commit.sha[0:7]} {scope}{commit.message} ({author}) {", ".join(prs)}\n")
 
-            gh_markdown += f"## {categories[category][1]}\n"
-            for change in changes:
-                gh_markdown += f"- {change}\n"
-            gh_markdown += "\n"
+    gh_markdown.write("</details>\n")
+    return gh_markdown.getvalue()
 
+def render_studio_changelog(versions: list[Version], images: Optional[dict[str, ProcessedImage]] = None) -> dict:
+    versions_json = [version.as_dict() for version in versions]
 
-        # Generate commit details
-        gh_markdown += "<details>\n"
-        gh_markdown += "<summary><h3>Commit Details</h3></summary>\n"
+    # Studio can't load WebP images on every platform, so the PNG variants are used
+    for version_json in versions_json:
+        for page in version_json["pages"]:
+            if page["image"] and (processed := (images or {}).get(page["image"]["source"])):
+                page["image"] |= { "source": processed.png, "width": processed.width, "height": processed.height }
 
-        for commit_type in parsed_commits:
-            commits = parsed_commits[commit_type]
-            if len(commits) == 0:
+    return {
+        "categoryNames": {cat: categories[cat][1] for cat in categories},
+        "versions": versions_json,
+    }
+
+@dataclass
+class VersionEntry:
+    celestetas_version: str
+    studio_version: str
+    # Byte range of the version inside the CHANGELOG file, starting at its heading
+    start: int
+    end: int
+
+class Changelog:
+    """
+    Index of the versions inside a CHANGELOG file, which is built in a single pass over the file.
+    Versions are only parsed once they're requested, and are cached by the hash of the file.
+    """
+
+    def __init__(self, changelog_file: str, cache_path: Optional[str] = None):
+        self.changelog_file = changelog_file
+        self.cache_path = cache_path
+
+        with open(changelog_file, "rb") as f:
+            self.data = f.read()
+        self.content_hash = hashlib.sha256(self.data).hexdigest()
+
+        self.cached = {}
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r") as f:
+                    cached = json.load(f)
+                if cached["cacheVersion"] == CHANGELOG_CACHE_VERSION and cached["hash"] == self.content_hash:
+                    self.cached = cached["versions"]
+            except (OSError, ValueError, KeyError):
+                print(f"Ignoring invalid cache file '{cache_path}'", flush=True)
+
+        self.entries: list[VersionEntry] = []
+        for celestetas_match in celestetas_heading_regex.finditer(self.data):
+            line_start = self.data.rfind(b"\n", 0, celestetas_match.start()) + 1
+            if self.entries and self.entries[-1].start == line_start:
+                continue # Mentioned multiple times on the same line
+
+            line_end = self.data.find(b"\n", celestetas_match.end())
+            studio_match = studio_heading_regex.search(self.data, line_start, line_end if line_end != -1 else len(self.data))
+            if not studio_match:
                 continue
 
-            if len(gh_markdown) != 0:
-                gh_markdown += "\n"
+            if self.entries:
+                self.entries[-1].end = line_start
+            self.entries.append(VersionEntry(celestetas_match.group(1).decode(), studio_match.group(1).decode(), line_start, len(self.data)))
+
+        self.parsed: dict[int, Version] = {}
+
+    def find(self, celestetas_version: str, studio_version: str) -> Optional[Version]:
+        for i, entry in enumerate(self.entries):
+            if entry.celestetas_version == celestetas_version and entry.studio_version == studio_version:
+                return self.load(i)
+        return None
+
+    def versions(self) -> list[Version]:
+        return [self.load(i) for i in range(len(self.entries))]
+
+    def load(self, i: int) -> Version:
+        if i in self.parsed:
+            return self.parsed[i]
+
+        key = self._cache_key(i)
+        version = Version.from_cache(self.cached[key]) if key in self.cached else self._parse(self.entries[i])
+        self.parsed[i] = version
+        return version
+
+    def _cache_key(self, i: int) -> str:
+        entry = self.entries[i]
+        return f"{entry.start}:{entry.celestetas_version}:{entry.studio_version}"
 
-            gh_markdown += f"### {conventional_commit_types[commit_type]}\n"
-            for commit in commits:
-                prs = [f"[#{pull_request.id}]({pull_request.url})" for pull_request in commit.pull_requests]
-                scope = f"**{commit.scope}**: " if commit.scope else ""
-                gh_markdown += f"- {commit.sha[0:7]} {scope}{commit.message} (@{commit.author}) {", ".join(prs)}\n"
+    def _parse(self, entry: VersionEntry) -> Version:
+        version = Version(entry.celestetas_version, entry.studio_version)
+
+        # Translates the line endings like reading the file in text mode
+        lines = io.StringIO(self.data[entry.start:entry.end].decode("utf-8"), newline=None)
+        next(lines) # Skip heading
+
+        current_page = None
+        for line in lines:
+            # Both change entries and images contain a '-'
+            entry_match = entry_regex.match(line) if "-" in line else None
+            if entry_match and entry_match["change_type"]:
+                change_type, change_message = entry_match["change_type"].lower(), entry_match["change_message"].strip()
+                if change_type not in version.change_category:
+                    print(f"Invalid change type '{change_type}' with message '{change_message}'", flush=True)
+                    continue
+                version.change_list.append((change_type, change_message))
+                version.change_category[change_type].append(change_message)
+            elif entry_match:
+                if not current_page:
+                    current_page = Page(text="")
+                current_page.image = Image(entry_match["src"], entry_match["align"], int(entry_match["width"]), int(entry_match["height"]))
+            elif current_page:
+                if line.startswith("---"):
+                    version.pages.append(current_page)
+                    current_page = None
+                else:
+                    current_page.text += line
+            elif line.strip():
+                current_page = Page(text=line)
 
-        gh_markdown += "</details>\n"
+        if current_page:
+            version.pages.append(current_page)
+        return version
 
-        with open(gh_changelog_file, "w") as f:
-            f.write(gh_markdown)
+    def save(self):
+        if not self.cache_path:
+            return
+        for i, version in self.parsed.items():
+            self.cached.setdefault(self._cache_key(i), dataclasses.asdict(version))
+        with open(self.cache_path, "w") as f:
+            json.dump({ "cacheVersion": CHANGELOG_CACHE_VERSION, "hash": self.content_hash, "versions": self.cached }, f)
 
-    with open(studio_changelog_file, "w") as f:
-        json.dump({
-            "categoryNames": {cat: categories[cat][1] for cat in categories},
-            "versions": [version.as_dict() for version in versions],
-        }, f)
+def parse_changelog(changelog_file) -> list[Version]:
+    return Changelog(changelog_file).versions()
 
-def parse_commit(commit_entry):
-    print(f"Parsing commit '{commit_entry["commit"]["message"].splitlines()[0]}'...", flush=True)
+def parse_commit(commit_entry, pull_request_entries: list[dict], verbose=True):
+    if verbose:
+        print(f"Parsing commit '{commit_entry["commit"]["message"].splitlines()[0]}'...", flush=True)
 
     commit = commit_entry["commit"]
     author = commit_entry["author"]
@@ -305,33 +534,15 @@ def parse_commit(commit_entry):
     commit_scope = commit_match.group(2)  if is_conventional_commit else None
     commit_message = commit_match.group(3)  if is_conventional_commit else commit_message_raw
 
-    # Link associated pull requests
-    gh_repo = os.getenv("GITHUB_REPO")
-    gh_token = os.getenv("GITHUB_TOKEN")
-
-    res = requests.request(
-        method="GET",
-        url=f"https://api.github.com/repos/{gh_repo}/commits/{commit_entry["sha"]}/pulls",
-        headers={
-            "Authorization": f"Bearer {gh_token}"
-        },
-        params = {
-            # There aren never going to be more than 100 PRs per commit.
-            "per_page": 100
-        }
-    )
-
-    pull_requests = []
-    if res.status_code == 200:
-        for pull_request_entry in res.json():
-            pull_requests.append(PullRequest(url=pull_request_entry["url"], id=pull_request_entry["number"]))
+    pull_requests = [PullRequest(url=entry["url"], id=entry["number"]) for entry in pull_request_entries]
 
     return Commit(
         sha=commit_entry["sha"],
         type=commit_type,
         scope=commit_scope,
         message=commit_message,
-        author=author["login"],
+        author=author["login"] if author else None,
+        author_name=(commit.get("author") or {}).get("name", ""),
         pull_requests=pull_requests,
     )
 
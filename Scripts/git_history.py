@@ -0,0 +1,77 @@
+import re
+import subprocess
+from typing import Optional
+
+# Subjects of GitHub merge commits / squash-merged pull requests
+merge_subject_regex = re.compile(r"^Merge pull request #(\d+) from ")
+squash_subject_regex = re.compile(r"\(#(\d+)\)$")
+
+# Commits made through the web interface or with a private email address
+noreply_email_regex = re.compile(r"^(?:\d+\+)?([^@]+)@users\.noreply\.github\.com$")
+
+def run_git(*args: str, cwd: Optional[str] = None) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True, encoding="utf-8").stdout
+
+def is_available(cwd: Optional[str] = None) -> bool:
+    try:
+        # A shallow clone doesn't contain the commits between the tags
+        return run_git("rev-parse", "--is-shallow-repository", cwd=cwd).strip() == "false"
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+def get_tags(cwd: Optional[str] = None) -> list[dict]:
+    """Release tags from newest to oldest, in the same format as the '/tags' API endpoint"""
+    tags = []
+    # '*objectname' is the tagged commit of annotated tags, while 'objectname' is the tag object itself
+    for line in run_git("tag", "--list", "v*", "--sort=-v:refname", "--format=%(refname:short) %(objectname) %(*objectname)", cwd=cwd).splitlines():
+        name, sha, *commit_sha = line.split()
+        tags.append({ "name": name, "commit": { "sha": commit_sha[0] if commit_sha else sha } })
+    return tags
+
+def get_login(author_email: str) -> Optional[str]:
+    # The local history only knows the GitHub username for no-reply emails
+    email_match = noreply_email_regex.match(author_email)
+    return email_match.group(1) if email_match else None
+
+def get_commits(base: str, head: str, gh_repo: str, cwd: Optional[str] = None) -> list[dict]:
+    """
+    Commits from base (exclusive) to head, in the same format as the commits of the '/compare' API endpoint.
+    Pull requests are taken from the subjects of merge / squash commits and attached as 'pullRequests'.
+    """
+    commits = []
+    for record in run_git("log", "--reverse", "--format=%H%x00%P%x00%an%x00%ae%x00%s%x1e", f"{base}..{head}", cwd=cwd).split("\x1e"):
+        if not record.strip():
+            continue
+
+        sha, parents, author_name, author_email, subject = record.strip("\n").split("\x00")
+        # Like the API, the author is null if it can't be linked to a GitHub user
+        login = get_login(author_email)
+        commits.append({
+            "sha": sha,
+            "commit": { "message": subject, "author": { "name": author_name } },
+            "author": { "login": login } if login else None,
+            "parents": [{ "sha": parent } for parent in parents.split()],
+            "pullRequests": [],
+        })
+
+    def pull_request(number: str) -> dict:
+        return { "number": int(number), "url": f"https://github.com/{gh_repo}/pull/{number}" }
+
+    commits_by_sha = { commit["sha"]: commit for commit in commits }
+    for commit in commits:
+        if squash_match := squash_subject_regex.search(commit["commit"]["message"]):
+            commit["pullRequests"].append(pull_request(squash_match.group(1)))
+            continue
+
+        merge_match = merge_subject_regex.match(commit["commit"]["message"])
+        if not merge_match or len(commit["parents"]) != 2:
+            continue
+
+        # All commits which were merged in belong to the pull request
+        first_parent, second_parent = (parent["sha"] for parent in commit["parents"])
+        for merged_sha in run_git("rev-list", f"{first_parent}..{second_parent}", cwd=cwd).split():
+            merged_commit = commits_by_sha.get(merged_sha)
+            if merged_commit and not merged_commit["pullRequests"]:
+                merged_commit["pullRequests"].append(pull_request(merge_match.group(1)))
+
+    return commits
@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import hashlib
+import asyncio
+import tempfile
+import requests
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qs, urlencode
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from request_scheduler import RequestScheduler
+
+# Resources addressed by commit SHAs never change, so they don't need to be revalidated
+immutable_regex = re.compile(r"/(?:commits/[0-9a-fA-F]{40}/|compare/[0-9a-fA-F]{40}\.\.\.[0-9a-fA-F]{40}(?:$|\?))")
+
+# Response headers which are kept in the cache
+cached_headers = ("Content-Type", "ETag", "Link")
+
+class ResponseCache:
+    """On-disk cache of API responses, with one JSON file per URL"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(key.encode()).hexdigest()}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+            return entry if entry.get("key") == key else None
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, entry: dict):
+        # Write atomically, since requests are made from multiple threads
+        with tempfile.NamedTemporaryFile('w', dir=self.directory, prefix=".tmp-", suffix=".json", delete=False) as f:
+            json.dump({ "key": key } | entry, f)
+        os.replace(f.name, self._path(key))
+
+    @staticmethod
+    def to_response(url: str, entry: dict) -> requests.Response:
+        res = requests.Response()
+        res.url = url
+        res.status_code = entry["status"]
+        res.headers = CaseInsensitiveDict(entry["headers"])
+        res.encoding = "utf-8"
+        res._content = entry["body"].encode("utf-8")
+        return res
+
+class GitHubClient:
+    """
+    Pooled connection to the GitHub REST / GraphQL API of a single repository.
+    All requests go through a RequestScheduler, so concurrent requests share its concurrency and rate limits.
+    """
+
+    def __init__(self, repo: str, token: str, max_workers=8, cache_dir: Optional[str] = None):
+        self.repo = repo
+
+        # Responses are cached across runs, unless GITHUB_CACHE_DIR is set to an empty string
+        if cache_dir is None:
+            cache_dir = os.getenv("GITHUB_CACHE_DIR", ".github-api-cache")
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.stats = { "requests": 0, "cached": 0, "revalidated": 0 }
+
+        # Can be pointed to a local stand-in server (see mock_github.py)
+        self.api_url = (os.getenv("GITHUB_API_URL") or "https://api.github.com").rstrip("/")
+        self.graphql_url = os.getenv("GITHUB_GRAPHQL_URL") or f"{self.api_url}/graphql"
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+        })
+        self.scheduler = RequestScheduler(self.session, max_concurrency=max_workers)
+
+    def get(self, url: str, params=None) -> requests.Response:
+        return self.scheduler.run(self.get_async(url, params))
+
+    async def get_async(self, url: str, params=None) -> requests.Response:
+        if not url.startswith("http"):
+            url = f"{self.api_url}/{url.lstrip('/')}"
+        if not self.cache:
+            self.stats["requests"] += 1
+            return await self.scheduler.request("GET", url, params=params)
+
+        key = requests.Request("GET", url, params=params).prepare().url
+        entry = self.cache.get(key)
+        if entry and entry["immutable"]:
+            self.stats["cached"] += 1
+            return ResponseCache.to_response(key, entry)
+
+        # Revalidating doesn't count towards the rate limit if the resource wasn't modified
+        headers = { "If-None-Match": entry["headers"]["ETag"] } if entry and "ETag" in entry["headers"] else None
+        self.stats["requests"] += 1
+        res = await self.scheduler.request("GET", url, params=params, headers=headers)
+        if res.status_code == 304 and entry:
+            self.stats["revalidated"] += 1
+            return ResponseCache.to_response(key, entry)
+
+        immutable = immutable_regex.search(key) is not None
+        if res.status_code == 200 and (immutable or "ETag" in res.headers):
+            self.cache.put(key, {
+                "immutable": immutable,
+                "status": res.status_code,
+                "headers": { header: res.headers[header] for header in cached_headers if header in res.headers },
+                "body": res.text,
+            })
+        return res
+
+    def get_all_pages(self, url: str, key: Optional[str] = None, per_page=100) -> list:
+        """Fetches all items of a paginated endpoint, requesting the remaining pages concurrently once the page count is known"""
+        return self.scheduler.run(self._get_all_pages(url, key, per_page))
+
+    async def _get_all_pages(self, url: str, key: Optional[str], per_page: int) -> list:
+        def page_items(res: requests.Response) -> list:
+            res.raise_for_status()
+            return res.json()[key] if key else res.json()
+
+        res = await self.get_async(url, params={ "per_page": per_page })
+        items = page_items(res)
+
+        if "last" in res.links:
+            last_url = urlsplit(res.links["last"]["url"])
+            query = { name: values[-1] for name, values in parse_qs(last_url.query).items() }
+            page_urls = [urlunsplit(last_url._replace(query=urlencode(query | { "page": page }))) for page in range(2, int(query["page"]) + 1)]
+
+            # Pages are merged in order, regardless of which finished first
+            for page_res in await asyncio.gather(*(self.get_async(page_url) for page_url in page_urls)):
+                items += page_items(page_res)
+            return items
+
+        # Without a 'last' link, the pages have to be followed one after another
+        while "next" in res.links:
+            res = await self.get_async(res.links["next"]["url"])
+            items += page_items(res)
+        return items
+
+    async def graphql(self, query: str, variables: dict) -> dict:
+        self.stats["requests"] += 1
+        res = await self.scheduler.request("POST", self.graphql_url, json={ "query": query, "variables": variables })
+        res.raise_for_status()
+
+        res_json = res.json()
+        if res_json.get("errors"):
+            raise RuntimeError(f"GraphQL query failed: {res_json['errors']}")
+        return res_json["data"]
+
+    def fetch_commit_details(self, shas: list[str], batch_size=50) -> dict[str, dict]:
+        """
+        Looks up the 'pullRequests' associated with each commit (with their 'number' and 'url')
+        and the GitHub login of its 'author', which is None if it's unknown
+        """
+        return self.scheduler.run(self._fetch_commit_details(shas, batch_size))
+
+    async def _fetch_commit_details(self, shas: list[str], batch_size: int) -> dict[str, dict]:
+        details = {}
+        if self.cache:
+            for sha in shas:
+                entry = self.cache.get(f"graphql:commitDetails:{sha}")
+                if entry:
+                    self.stats["cached"] += 1
+                    details[sha] = entry["details"]
+
+        try:
+            remaining = [sha for sha in shas if sha not in details]
+            batches = [remaining[i:i + batch_size] for i in range(0, len(remaining), batch_size)]
+            for batch in await asyncio.gather(*(self._fetch_commit_details_graphql(batch) for batch in batches)):
+                details |= batch
+
+                if self.cache:
+                    for sha, commit_details in batch.items():
+                        self.cache.put(f"graphql:commitDetails:{sha}", { "details": commit_details })
+            return details
+        except (requests.RequestException, RuntimeError) as e:
+            print(f"Batched commit lookup failed, falling back to one request per commit: {e}", flush=True)
+
+        remaining = [sha for sha in shas if sha not in details]
+        for sha, commit_details in zip(remaining, await asyncio.gather(*(self._fetch_commit_details_rest(sha) for sha in remaining))):
+            details[sha] = commit_details
+        return details
+
+    async def _fetch_commit_details_graphql(self, shas: list[str]) -> dict[str, dict]:
+        # Every commit is looked up with an aliased field, so that one query resolves the whole batch
+        fields = []
+        for i, sha in enumerate(shas):
+            if not re.fullmatch(r"[0-9a-fA-F]{40}", sha):
+                raise RuntimeError(f"Invalid commit SHA '{sha}'")
+            fields.append(f'c{i}: object(oid: "{sha}") {{ ... on Commit {{ author {{ user {{ login }} }} associatedPullRequests(first: 10) {{ nodes {{ number url }} }} }} }}')
+
+        owner, name = self.repo.split("/", 1)
+        data = await self.graphql(f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {' '.join(fields)} }} }}", { "owner": owner, "name": name })
+
+        details = {}
+        for i, sha in enumerate(shas):
+            commit = data["repository"].get(f"c{i}")
+            if not commit:
+                continue # Not pushed to GitHub
+
+            user = (commit.get("author") or {}).get("user") or {}
+            nodes = (commit.get("associatedPullRequests") or {}).get("nodes") or []
+            details[sha] = {
+                "pullRequests": [{ "number": node["number"], "url": node["url"] } for node in nodes],
+                "author": user.get("login"),
+            }
+        return details
+
+    async def _fetch_commit_details_rest(self, sha: str) -> dict:
+        res = await self.get_async(f"repos/{self.repo}/commits/{sha}/pulls", params={
+            # There aren never going to be more than 100 PRs per commit.
+            "per_page": 100
+        })
+        # Unknown commits don't have any pull requests, but other errors shouldn't be silently ignored
+        if res.status_code in (404, 422):
+            return { "pullRequests": [], "author": None }
+        res.raise_for_status()
+        return { "pullRequests": [{ "number": entry["number"], "url": entry["html_url"] } for entry in res.json()], "author": None }
+
+    def close(self):
+        self.scheduler.close()
+        self.session.close()
+        print(f"GitHub API: {self.stats['requests']} requests, {self.stats['cached']} cached, {self.stats['revalidated']} revalidated", flush=True)
+        if any(stats.latencies for stats in self.scheduler.stats.values()):
+            print(self.scheduler.summary(), flush=True)
@@ -0,0 +1,198 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+import threading
+from typing import Optional, Iterable
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image as PILImage, UnidentifiedImageError
+except ImportError:
+    PILImage = None
+    # Pillow's own exception derives from OSError as well
+    UnidentifiedImageError = OSError
+
+# Bump whenever the produced variants change, to invalidate existing ones
+IMAGE_PIPELINE_VERSION = 1
+
+# Variants are rendered at up to twice the displayed size, for high-DPI screens
+VARIANT_SCALE = 2
+WEBP_QUALITY = 85
+
+# Variants are named '<stem>.<key>.png' / '<stem>.<key>.webp', next to the original '<stem>.<ext>'
+variant_regex = re.compile(r"^(.*)\.[0-9a-f]{12}\.(png|webp)$")
+
+@dataclass
+class ProcessedImage:
+    src: str
+    # Displayed size, with the height matching the real aspect ratio
+    width: int
+    height: int
+    # Paths of the optimized variants, relative to the repository root
+    png: str
+    webp: str
+    # Whether the variants are tracked by git, i.e. can be linked from the released commit
+    committed: bool = False
+
+class ImagePipeline:
+    """
+    Validates the images of CHANGELOG pages and produces optimized PNG / WebP variants next to them.
+    Variants are named after the hash of their source and settings, so unchanged images are never reprocessed.
+    """
+
+    def __init__(self, root: str = "."):
+        self.root = root
+        # Images which were already processed during this run, since multiple renderers share them
+        self.processed: dict[tuple[str, int, int], Optional[ProcessedImage]] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def is_supported() -> bool:
+        return PILImage is not None
+
+    def _variant_key(self, data: bytes, width: int, height: int) -> str:
+        settings = f"{IMAGE_PIPELINE_VERSION}:{width}x{height}:{VARIANT_SCALE}:{WEBP_QUALITY}".encode()
+        return hashlib.sha256(settings + b"\0" + data).hexdigest()[:12]
+
+    def _tracked_files(self, paths: list[str]) -> set[str]:
+        try:
+            res = subprocess.run(["git", "ls-files", "-z", "--", *paths], cwd=self.root, capture_output=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return set()
+        return set(res.stdout.decode().split("\0"))
+
+    def process(self, src: str, width: int, height: int) -> Optional[ProcessedImage]:
+        """Returns None if the image doesn't exist or can't be processed, in which case the original should be used"""
+        path = os.path.join(self.root, src)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            print(f"Image '{src}' doesn't exist\n", end="", flush=True)
+            return None
+
+        try:
+            return self._process(src, width, height, path, data)
+        except (OSError, UnidentifiedImageError) as e:
+            print(f"Failed to process image '{src}', using the original: {e}\n", end="", flush=True)
+            return None
+
+    def _process(self, src: str, width: int, height: int, path: str, data: bytes) -> ProcessedImage:
+        with PILImage.open(path) as image:
+            real_width, real_height = image.size
+
+            # The declared height is only used for layout, so it has to match the actual aspect ratio
+            expected_height = round(width * real_height / real_width)
+            if abs(expected_height - height) > 1:
+                print(f"Image '{src}' is declared as {width}x{height}, but is {real_width}x{real_height}. Using {width}x{expected_height} instead\n", end="", flush=True)
+                height = expected_height
+            if width > real_width:
+                print(f"Image '{src}' is displayed at {width}x{height}, but is only {real_width}x{real_height}\n", end="", flush=True)
+
+            stem, _ = os.path.splitext(src)
+            key = self._variant_key(data, width, height)
+            png_src, webp_src = f"{stem}.{key}.png", f"{stem}.{key}.webp"
+            png_path, webp_path = os.path.join(self.root, png_src), os.path.join(self.root, webp_src)
+            if os.path.exists(png_path) and os.path.exists(webp_path):
+                return ProcessedImage(src, width, height, png_src, webp_src)
+
+            variant_width = min(real_width, width * VARIANT_SCALE)
+            variant_height = round(variant_width * real_height / real_width)
+            variant = image.convert("RGBA") if image.mode not in ("RGB", "RGBA") else image.copy()
+            if (variant_width, variant_height) != image.size:
+                variant = variant.resize((variant_width, variant_height), PILImage.Resampling.LANCZOS)
+
+        try:
+            variant.save(png_path, "PNG", optimize=True)
+            variant.save(webp_path, "WEBP", quality=WEBP_QUALITY, method=6)
+        except BaseException:
+            # Partial variants would be mistaken for finished ones by the next run
+            for variant_path in (png_path, webp_path):
+                if os.path.exists(variant_path):
+                    os.remove(variant_path)
+            raise
+
+        sizes = [os.path.getsize(variant_path) for variant_path in (png_path, webp_path)]
+        print(f"Optimized image '{src}' ({len(data) / 1024:.1f} KiB) to PNG ({sizes[0] / 1024:.1f} KiB) / WebP ({sizes[1] / 1024:.1f} KiB)\n", end="", flush=True)
+        return ProcessedImage(src, width, height, png_src, webp_src)
+
+    def process_all(self, images: Iterable[tuple[str, int, int]], max_workers=4) -> dict[str, ProcessedImage]:
+        """Processes (src, width, height) entries in parallel, returning the processed images by their source"""
+        if not self.is_supported():
+            print("Pillow isn't installed, using the original images", flush=True)
+            return {}
+
+        images = list(dict.fromkeys(images))
+        # Concurrent renderers would otherwise write the same variants at once
+        with self.lock:
+            new_images = [image for image in images if image not in self.processed]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                processed = list(executor.map(lambda image: self.process(*image), new_images))
+
+            new_processed = [image for image in processed if image]
+            tracked = self._tracked_files([path for image in new_processed for path in (image.png, image.webp)]) if new_processed else set()
+            for image in new_processed:
+                image.committed = image.png in tracked and image.webp in tracked
+            self.processed.update(zip(new_images, processed))
+
+            return { image[0]: self.processed[image] for image in images if self.processed[image] }
+
+def prune_unused_images(directory: str, version_history_file: str) -> list[str]:
+    """
+    Removes the images which Studio doesn't load from the directory, returning their paths.
+    These are the originals of referenced PNG variants, all WebP variants and variants which aren't referenced (anymore).
+    Originals which couldn't be processed are referenced directly and therefore kept.
+    """
+    with open(version_history_file, "r") as f:
+        version_history = json.load(f)
+    referenced = { os.path.normpath(page["image"]["source"]) for version in version_history["versions"] for page in version["pages"] if page["image"] }
+    replaced_stems = { match[1] for source in referenced if (match := variant_regex.match(source)) and match[2] == "png" }
+
+    removed = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.normpath(os.path.join(dirpath, filename))
+            if path in referenced:
+                continue
+            if variant_regex.match(path) or os.path.splitext(path)[0] in replaced_stems:
+                os.remove(path)
+                removed.append(path)
+    return sorted(removed)
+
+def prune_main(args: list[str]):
+    parser = argparse.ArgumentParser(prog="image_assets.py prune", description="Removes the images which Studio doesn't load, before they're shipped with it")
+    parser.add_argument("directory", help="Directory with the images, relative to the repository root")
+    parser.add_argument("version_history", help="Studio changelog (version_history.json) referencing the images")
+    args = parser.parse_args(args)
+
+    for path in prune_unused_images(args.directory, args.version_history):
+        print(f"Removed '{path}'", flush=True)
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "prune":
+        prune_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Produces the optimized image variants of a CHANGELOG file, which should be committed alongside the images")
+    parser.add_argument("changelog", help="CHANGELOG file with '<!-- IMAGE -->' markers")
+    args = parser.parse_args()
+
+    # Imported here, since the changelog script uses this module itself
+    from generate_changelog import Changelog
+
+    pipeline = ImagePipeline()
+    if not pipeline.is_supported():
+        print("Pillow is required to process images", flush=True)
+        sys.exit(1)
+
+    processed = pipeline.process_all((page.image.src, page.image.width, page.image.height) for version in Changelog(args.changelog).versions() for page in version.pages if page.image)
+    for image in processed.values():
+        print(f"{image.src}: {image.width}x{image.height} -> {image.png}, {image.webp}{'' if image.committed else ' (not committed)'}", flush=True)
+
+if __name__ == "__main__":
+    main()
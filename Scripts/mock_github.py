@@ -0,0 +1,298 @@
+import re
+import sys
+import json
+import time
+import random
+import signal
+import hashlib
+import argparse
+import threading
+from typing import Optional
+from dataclasses import dataclass, field
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# Local stand-in for the parts of the GitHub API used by the release scripts.
+# Point the scripts to it with GITHUB_API_URL=http://127.0.0.1:<port>
+
+commit_types = ["feat", "fix", "tweak", "refactor", "perf", "docs", "chore", "ci", "remove"]
+commit_scopes = [None, None, "Studio", "Tool", "InfoHUD", "Commands"]
+commit_words = "add fix update support studio input feather dash command file info hud frame level room auto complete crash".split()
+authors = ["DemoJameson", "psyGamer", "Kataiser", "jakobhellermann", "EuniverseCat"]
+
+@dataclass
+class MockRepository:
+    name: str
+    tags: list[dict] = field(default_factory=list)
+    commits: list[dict] = field(default_factory=list)
+    # Commit SHA -> associated pull requests
+    pull_requests: dict[str, list[dict]] = field(default_factory=dict)
+
+def generate_repository(name: str, commit_count: int, seed: int) -> MockRepository:
+    """Deterministically generates a linear history with a tag at its start and end"""
+    rng = random.Random(seed)
+    repository = MockRepository(name)
+
+    def sha(i):
+        return hashlib.sha1(f"{seed}:{i}".encode()).hexdigest()
+
+    base_sha = sha(-1)
+    parent = base_sha
+    pr_number = 100
+    for i in range(commit_count):
+        commit_sha = sha(i)
+        parents = [parent]
+        if rng.random() < 0.1:
+            pr_number += 1
+            parents.append(sha(-i - 2))
+            message = f"Merge pull request #{pr_number} from {rng.choice(authors)}/branch-{i}"
+        else:
+            commit_type = rng.choice(commit_types) if rng.random() < 0.8 else None
+            scope = rng.choice(commit_scopes)
+            text = " ".join(rng.choice(commit_words) for _ in range(rng.randint(3, 8))).capitalize()
+            message = f"{commit_type}{f'({scope})' if scope else ''}: {text}" if commit_type else text
+            if rng.random() < 0.6:
+                pr_number += 1
+                repository.pull_requests[commit_sha] = [{
+                    "number": pr_number,
+                    "url": f"https://api.github.com/repos/{name}/pulls/{pr_number}",
+                    "html_url": f"https://github.com/{name}/pull/{pr_number}",
+                }]
+
+        author = rng.choice(authors)
+        repository.commits.append({
+            "sha": commit_sha,
+            "commit": { "message": message, "author": { "name": author } },
+            "author": { "login": author },
+            "parents": [{ "sha": parent_sha } for parent_sha in parents],
+        })
+        parent = commit_sha
+
+    repository.tags = [
+        { "name": "v3.1.0", "commit": { "sha": parent } },
+        { "name": "v3.0.0", "commit": { "sha": base_sha } },
+    ]
+    return repository
+
+@dataclass
+class Throttling:
+    # Primary rate limit per window (in seconds)
+    rate_limit: int = 5000
+    window: float = 3600.0
+    # Fraction of requests which randomly fail because of a secondary rate limit / server error
+    secondary_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after: int = 1
+    seed: int = 0
+
+class MockGitHubHandler(BaseHTTPRequestHandler):
+    server: "MockGitHubServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode()
+        headers = (headers or {}) | self.rate_limit_headers
+
+        # Conditional requests, like GitHub's weak ETags
+        etag = f'W/"{hashlib.sha256(body).hexdigest()}"'
+        if status == 200 and self.command == "GET":
+            headers |= { "ETag": etag }
+            if self.headers.get("If-None-Match") == etag:
+                self.server.count_request("304", self.path)
+                self.send_response(304)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self, method: str):
+        self.server.count_request(method, self.path)
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        body = b""
+        if "Content-Length" in self.headers:
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+
+        self.rate_limit_headers, throttled = self.server.throttle()
+        if throttled:
+            status, message, headers = throttled
+            self.server.count_request(str(status), self.path)
+            return self.send_json({ "message": message }, status=status, headers=headers)
+
+        url = urlsplit(self.path)
+        query = { key: values[-1] for key, values in parse_qs(url.query).items() }
+        repository = self.server.repository
+        repo_path = f"/repos/{repository.name}"
+
+        if method == "POST" and url.path == "/graphql":
+            return self.send_json(self.server.resolve_graphql(json.loads(body)))
+        if method != "GET" or not url.path.startswith(repo_path + "/"):
+            return self.send_json({ "message": "Not Found" }, status=404)
+
+        path = url.path[len(repo_path):]
+        if path == "/tags":
+            return self.send_json(repository.tags)
+
+        if match := re.fullmatch(r"/commits/([0-9a-f]{40})/pulls", path):
+            return self.send_json(repository.pull_requests.get(match.group(1), []))
+
+        if match := re.fullmatch(r"/compare/([0-9a-f]{40})\.\.\.([0-9a-f]{40})", path):
+            return self.send_compare(url.path, match.group(1), match.group(2), query)
+
+        return self.send_json({ "message": "Not Found" }, status=404)
+
+    def send_compare(self, path: str, base: str, head: str, query: dict):
+        shas = [commit["sha"] for commit in self.server.repository.commits]
+        start = 0 if base not in shas else shas.index(base) + 1
+        end = len(shas) if head not in shas else shas.index(head) + 1
+        commits = self.server.repository.commits[start:end]
+
+        page = max(int(query.get("page", 1)), 1)
+        per_page = min(max(int(query.get("per_page", 250)), 1), self.server.max_per_page)
+        last_page = max((len(commits) + per_page - 1) // per_page, 1)
+
+        links = []
+        base_url = f"http://{self.headers['Host']}{path}"
+        if page < last_page:
+            links.append(f'<{base_url}?per_page={per_page}&page={page + 1}>; rel="next"')
+            links.append(f'<{base_url}?per_page={per_page}&page={last_page}>; rel="last"')
+        if page > 1:
+            links.append(f'<{base_url}?per_page={per_page}&page=1>; rel="first"')
+            links.append(f'<{base_url}?per_page={per_page}&page={page - 1}>; rel="prev"')
+
+        self.send_json({
+            "status": "ahead",
+            "total_commits": len(commits),
+            "commits": commits[(page - 1) * per_page:page * per_page],
+        }, headers={ "Link": ", ".join(links) } if links else None)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+class MockGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, repository: MockRepository, latency=0.0, max_per_page=100, throttling: Optional[Throttling] = None, verbose=False):
+        super().__init__(address, MockGitHubHandler)
+        self.repository = repository
+        self.latency = latency
+        self.max_per_page = max_per_page
+        self.throttling = throttling or Throttling()
+        self.verbose = verbose
+
+        self.request_counts: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+        self.rng = random.Random(self.throttling.seed)
+        self.window_start = time.time()
+        self.window_used = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self, kind: str, path: str):
+        # Group by endpoint, so that '/commits/<sha>/pulls' is counted as one
+        endpoint = re.sub(r"[0-9a-f]{40}", "{sha}", urlsplit(path).path)
+        with self.lock:
+            self.request_counts[f"{kind} {endpoint}"] = self.request_counts.get(f"{kind} {endpoint}", 0) + 1
+
+    def throttle(self) -> tuple[dict[str, str], Optional[tuple[int, str, dict[str, str]]]]:
+        """Returns the rate limit headers of the current request and the error response if it's throttled"""
+        throttling = self.throttling
+        with self.lock:
+            # Primary rate limit, which is reset after every window
+            now = time.time()
+            if now - self.window_start >= throttling.window:
+                self.window_start, self.window_used = now, 0
+            self.window_used += 1
+
+            reset = int(self.window_start + throttling.window) + 1
+            remaining = max(throttling.rate_limit - self.window_used, 0)
+            headers = {
+                "X-RateLimit-Limit": str(throttling.rate_limit),
+                "X-RateLimit-Remaining": str(remaining),
+                "X-RateLimit-Used": str(min(self.window_used, throttling.rate_limit)),
+                "X-RateLimit-Reset": str(reset),
+            }
+            if self.window_used > throttling.rate_limit:
+                return headers, (403, "API rate limit exceeded", {})
+
+            roll = self.rng.random()
+
+        if roll < throttling.secondary_limit_rate:
+            return headers, (403, "You have exceeded a secondary rate limit. Please wait a few minutes before you try again.", { "Retry-After": str(throttling.retry_after) })
+        if roll < throttling.secondary_limit_rate + throttling.error_rate:
+            return headers, (502, "Server Error", {})
+        return headers, None
+
+    def resolve_graphql(self, request: dict) -> dict:
+        # Only supports the aliased 'object(oid: ...)' lookups of commit authors / associated pull requests
+        commits = { commit["sha"]: commit for commit in self.repository.commits }
+        objects = {}
+        for alias, sha in re.findall(r'(\w+)\s*:\s*object\(oid:\s*"([0-9a-fA-F]{40})"\)', request["query"]):
+            commit = commits.get(sha.lower())
+            if not commit:
+                objects[alias] = None
+                continue
+
+            nodes = [{ "number": entry["number"], "url": entry["html_url"] } for entry in self.repository.pull_requests.get(sha.lower(), [])]
+            objects[alias] = { "author": { "user": commit["author"] }, "associatedPullRequests": { "nodes": nodes } }
+        return { "data": { "repository": objects } }
+
+    def start(self) -> threading.Thread:
+        """Serves in a background thread, for use from other scripts"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves a synthetic repository through a local stand-in of the GitHub API")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--repo", default="EverestAPI/CelesteTAS-EverestInterop", help="Name of the served repository")
+    parser.add_argument("--commits", type=int, default=300, help="Amount of commits between the two tags (default: 300)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated history (default: 0)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial delay of every response in seconds")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="Amount of requests per rate limit window (default: 5000)")
+    parser.add_argument("--rate-limit-window", type=float, default=3600.0, help="Duration of a rate limit window in seconds (default: 3600)")
+    parser.add_argument("--secondary-limit-rate", type=float, default=0.0, help="Fraction of requests which hit a secondary rate limit")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests which fail with a server error")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    throttling = Throttling(args.rate_limit, args.rate_limit_window, args.secondary_limit_rate, args.error_rate, seed=args.seed)
+    server = MockGitHubServer((args.host, args.port), generate_repository(args.repo, args.commits, args.seed), args.latency, throttling=throttling, verbose=args.verbose)
+    print(f"Serving '{args.repo}' with {args.commits} commits on {server.url}", flush=True)
+
+    # Also print the request counts when being terminated by another script
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for endpoint, count in sorted(server.request_counts.items()):
+            print(f"{count:>6} {endpoint}", file=sys.stderr, flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from typing import Any, Callable
+from contextlib import contextmanager, ExitStack
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+from tracing import tracer, span
+from generate_changelog import Changelog, find_release_versions, fetch_commit_overview, process_images, render_gamebanana_changelog, render_github_changelog, render_studio_changelog
+from image_assets import ImagePipeline
+from gamebanana_upload import Browser, Target, TargetResult, get_targets, upload_file, publish_update, file_md5, print_results
+
+# Runs the changelog generation and GameBanana publishing as one graph of stages.
+# Stages only wait for the stages they depend on, so that logging in and uploading the release
+# happen while the changelog is still being generated. Only the final update needs the changelog.
+
+@dataclass
+class Stage:
+    name: str
+    # Called with the results of the dependencies, in order
+    function: Callable[..., Any]
+    dependencies: list[str] = field(default_factory=list)
+
+def run_stages(stages: list[Stage], max_workers=8) -> dict[str, Any]:
+    """Runs every stage as soon as all of its dependencies are finished. Stages depending on a failed stage are skipped"""
+    stages_by_name = { stage.name: stage for stage in stages }
+    for stage in stages:
+        for dependency in stage.dependencies:
+            if dependency not in stages_by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+    results: dict[str, Any] = {}
+    failed: set[str] = set()
+    pending = list(stages)
+    running: dict[Future, Stage] = {}
+
+    def run_stage(stage: Stage, arguments: list):
+        with span(stage.name):
+            return stage.function(*arguments)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Stage") as executor:
+        while pending or running:
+            # Skipping a stage can cause further stages to be skipped
+            changed = True
+            while changed:
+                changed = False
+                for stage in list(pending):
+                    if any(dependency in failed for dependency in stage.dependencies):
+                        print(f"Skipping stage '{stage.name}', since a dependency failed", flush=True)
+                        failed.add(stage.name)
+                        pending.remove(stage)
+                        changed = True
+                    elif all(dependency in results for dependency in stage.dependencies):
+                        running[executor.submit(run_stage, stage, [results[dependency] for dependency in stage.dependencies])] = stage
+                        pending.remove(stage)
+
+            if not running:
+                # Every remaining stage was skipped
+                if not pending:
+                    break
+                raise ValueError(f"Stages {", ".join(stage.name for stage in pending)} have cyclic dependencies")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except Exception:
+                    print(f"Stage '{stage.name}' failed:", flush=True)
+                    traceback.print_exc()
+                    failed.add(stage.name)
+
+    if failed:
+        raise RuntimeError(f"Release failed, since stages {", ".join(sorted(failed))} didn't complete")
+    return results
+
+def release_stages(commit_message: str, changelog_file: str, release_file: str, output_dir: str, targets: list[Target], publish: bool, resources: ExitStack) -> list[Stage]:
+    gh_repo = os.getenv("GITHUB_REPO")
+    version_info_file = os.path.join(output_dir, "version_info.txt")
+    gb_changelog_file = os.path.join(output_dir, "gamebanana_changelog.json")
+    gh_changelog_file = os.path.join(output_dir, "github_changelog.md")
+    studio_changelog_file = os.path.join(output_dir, "studio_changelog.json")
+
+    def versions():
+        celestetas_version, studio_version = find_release_versions(commit_message)
+        with open(version_info_file, "w") as f:
+            f.write(f"{celestetas_version}\n")
+            f.write(f"{studio_version}\n")
+        return celestetas_version, studio_version
+
+    def changelog(release_versions):
+        changelog = Changelog(changelog_file, os.getenv("CHANGELOG_CACHE", ".changelog-cache.json"))
+        version = changelog.find(*release_versions)
+        if not version:
+            raise ValueError(f"Version v{release_versions[0]} / Studio v{release_versions[1]} isn't part of '{changelog_file}'")
+        return changelog, version
+
+    def gamebanana_changelog(parsed):
+        update_json = render_gamebanana_changelog(parsed[1])
+        with open(gb_changelog_file, "w") as f:
+            f.write(json.dumps(update_json))
+        return update_json
+
+    image_pipeline = ImagePipeline()
+
+    def github_changelog(parsed, commit_overview):
+        if not commit_overview:
+            return None
+        current_tag, parsed_commits = commit_overview
+        # Only the images of the released version are needed
+        images = process_images([parsed[1]], image_pipeline)
+        with open(gh_changelog_file, "w") as f:
+            f.write(render_github_changelog(parsed[1], gh_repo, current_tag["commit"]["sha"], parsed_commits, images))
+        return gh_changelog_file
+
+    def studio_changelog(parsed):
+        versions = parsed[0].versions()
+        images = process_images(versions, image_pipeline)
+        with open(studio_changelog_file, "w") as f:
+            json.dump(render_studio_changelog(versions, images), f)
+        parsed[0].save()
+        return studio_changelog_file
+
+    stages = [
+        Stage("versions", versions),
+        Stage("changelog", changelog, ["versions"]),
+        Stage("commits", lambda: fetch_commit_overview(gh_repo, os.getenv("GITHUB_TOKEN"))),
+        Stage("gamebanana changelog", gamebanana_changelog, ["changelog"]),
+        Stage("github changelog", github_changelog, ["changelog", "commits"]),
+        Stage("studio changelog", studio_changelog, ["changelog"]),
+    ]
+    if not publish:
+        return stages
+
+    def gamebanana_login():
+        browser = Browser()
+        # Closed once the release is finished, even if some stages failed
+        resources.callback(browser.quit)
+        browser.login(targets[0])
+        return browser
+
+    def upload(target: Target, browser: Browser, release_versions):
+        start_time = time.perf_counter()
+        return upload_file(browser, release_file, *release_versions, target), start_time
+
+    def publish(target: Target, browser: Browser, upload_result, md5, update_json, release_versions):
+        file_id, start_time = upload_result
+        publish_update(browser, file_id, md5, update_json, *release_versions, target)
+        return TargetResult(target, "published", time.perf_counter() - start_time, file_id)
+
+    # All targets share the logged-in browser, which uploads them one after another.
+    # Each upload stays in the tab of its target, until its update can be posted with the changelog
+    stages += [
+        Stage("gamebanana login", gamebanana_login),
+        Stage("artifact hash", lambda: file_md5(release_file)),
+    ]
+    for target in targets:
+        stages += [
+            Stage(f"upload {target}", lambda browser, release_versions, target=target: upload(target, browser, release_versions), ["gamebanana login", "versions"]),
+            Stage(f"publish {target}", lambda browser, upload_result, md5, update_json, release_versions, target=target: publish(target, browser, upload_result, md5, update_json, release_versions),
+                  ["gamebanana login", f"upload {target}", "artifact hash", "gamebanana changelog", "versions"]),
+        ]
+    return stages
+
+@contextmanager
+def local_stand_in():
+    """Serves the mock GitHub API and points the release scripts to it"""
+    from mock_github import MockGitHubServer, generate_repository
+
+    gh_repo = "EverestAPI/CelesteTAS-EverestInterop"
+    github = MockGitHubServer(("127.0.0.1", 0), generate_repository(gh_repo, 300, 0))
+    github.start()
+
+    environment = {
+        "GITHUB_REPO": gh_repo,
+        "GITHUB_TOKEN": "dry-run",
+        "GITHUB_API_URL": github.url,
+        "GITHUB_GRAPHQL_URL": f"{github.url}/graphql",
+        "GITHUB_CACHE_DIR": "",
+        "CHANGELOG_SOURCE": "github",
+    }
+    previous_environment = { key: os.environ.get(key) for key in environment }
+    os.environ.update(environment)
+    print(f"Dry-run against GitHub stand-in on {github.url}", flush=True)
+
+    try:
+        yield
+    finally:
+        for key, value in previous_environment.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+        github.shutdown()
+        for endpoint, count in sorted(github.request_counts.items()):
+            print(f"{count:>6} {endpoint}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates the changelogs and publishes the release to GameBanana, running independent stages in parallel")
+    parser.add_argument("commit_message", help="Message of the release commit, containing the CelesteTAS / Studio versions")
+    parser.add_argument("changelog", help="CHANGELOG file of the release")
+    parser.add_argument("release_file", help="Release archive to upload to GameBanana")
+    parser.add_argument("-o", "--output", default=".", help="Directory to write the changelogs / version info into (default: current directory)")
+    parser.add_argument("--no-publish", action="store_true", help="Only generate the changelogs")
+    parser.add_argument("--dry-run", action="store_true", help="Run against a local stand-in of the GitHub API, without publishing to GameBanana")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Amount of stages running in parallel (default: 8)")
+    args = parser.parse_args()
+
+    # GameBanana is only published to through the browser, which can't be pointed to a stand-in
+    if args.dry_run and not args.no_publish:
+        print("Not publishing to GameBanana during a dry-run", flush=True)
+    publish = not args.no_publish and not args.dry_run
+    targets = get_targets() if publish else []
+
+    os.makedirs(args.output, exist_ok=True)
+    try:
+        with ExitStack() as resources:
+            if args.dry_run:
+                resources.enter_context(local_stand_in())
+            stage_list = release_stages(args.commit_message, args.changelog, args.release_file, args.output, targets, publish, resources)
+            results = run_stages(stage_list, args.jobs)
+    except RuntimeError as e:
+        print(e, flush=True)
+        sys.exit(1)
+    finally:
+        tracer.finish()
+
+    if not targets:
+        return
+
+    target_results = [results[f"publish {target}"] for target in targets]
+    print_results(target_results)
+    if any(result.status != "published" for result in target_results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
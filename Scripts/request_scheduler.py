@@ -0,0 +1,177 @@
+import re
+import math
+import time
+import random
+import asyncio
+import threading
+import functools
+import requests
+from typing import Coroutine, Optional
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
+from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
+
+# Endpoints are grouped by their path, without commit SHAs / numeric IDs
+endpoint_sha_regex = re.compile(r"[0-9a-fA-F]{40}")
+endpoint_id_regex = re.compile(r"(?<=/)\d+(?=/|$)")
+
+def endpoint_name(method: str, url: str) -> str:
+    path = endpoint_id_regex.sub("{id}", endpoint_sha_regex.sub("{sha}", urlsplit(url).path))
+    return f"{method} {path}"
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a 'Retry-After' header, which is either a delay in seconds or an HTTP-date"""
+    if value is None:
+        return None
+    try:
+        delay = float(value)
+        return max(delay, 0.0) if math.isfinite(delay) else None
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(date.timestamp() - time.time(), 0.0)
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    retries: int = 0
+    errors: int = 0
+
+    def percentile(self, p: float) -> float:
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+
+class RequestScheduler:
+    """
+    Runs requests on a background asyncio event loop, with a bound on the amount of concurrent requests.
+    Requests are paced according to the rate limit headers, and retried with jittered exponential backoff
+    on server errors, secondary rate limits and connection errors.
+    """
+
+    def __init__(self, session: requests.Session, max_concurrency=8, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.session = session
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="RequestScheduler", daemon=True)
+        self.thread.start()
+
+        # requests is blocking, so the actual I/O happens on a thread pool of the same size
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+        # Pacing state (in time.monotonic() seconds), only accessed from the event loop
+        self.paused_until = 0.0
+        self.next_slot = 0.0
+        self.interval = 0.0
+
+        self.stats: dict[str, EndpointStats] = {}
+
+    def run(self, coroutine: Coroutine):
+        """Runs the coroutine on the event loop and blocks until it's finished"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        endpoint = endpoint_name(method, url)
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+
+        for attempt in range(self.max_retries + 1):
+            res, error = None, None
+            async with self.semaphore:
+                await self._wait_for_slot()
+
+                start_time = time.perf_counter()
+                try:
+                    res = await self.loop.run_in_executor(self.executor, functools.partial(self.session.request, method, url, **kwargs))
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                stats.latencies.append(time.perf_counter() - start_time)
+
+                if res is not None:
+                    self._update_rate_limit(res)
+
+            delay, reason = self._retry_delay(res, error, attempt)
+            if delay is None or attempt == self.max_retries:
+                if error:
+                    stats.errors += 1
+                    raise error
+                if res.status_code >= 400:
+                    stats.errors += 1
+                return res
+
+            stats.retries += 1
+            print(f"Retrying {endpoint} in {delay:.1f}s: {reason}", flush=True)
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter", so that concurrent requests don't retry in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _retry_delay(self, res: Optional[requests.Response], error: Optional[Exception], attempt: int) -> tuple[Optional[float], str]:
+        if error:
+            return self._backoff(attempt), str(error)
+
+        if res.status_code == 429 or (res.status_code == 403 and ("Retry-After" in res.headers or res.headers.get("X-RateLimit-Remaining") == "0" or "rate limit" in res.text.lower())):
+            retry_after = parse_retry_after(res.headers.get("Retry-After"))
+            if retry_after is not None:
+                delay = retry_after
+            elif res.headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in res.headers:
+                delay = max(float(res.headers["X-RateLimit-Reset"]) - time.time(), 0.0) + 1.0
+            else:
+                delay = self._backoff(attempt)
+
+            # Every other request has to wait as well
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            return delay, f"Rate limited ({res.status_code})"
+
+        if res.status_code >= 500:
+            return self._backoff(attempt), f"Server error ({res.status_code})"
+
+        return None, ""
+
+    def _update_rate_limit(self, res: requests.Response):
+        if "X-RateLimit-Remaining" not in res.headers or "X-RateLimit-Reset" not in res.headers:
+            return
+
+        remaining = int(res.headers["X-RateLimit-Remaining"])
+        limit = int(res.headers.get("X-RateLimit-Limit", 0))
+        time_to_reset = max(float(res.headers["X-RateLimit-Reset"]) - time.time(), 0.0)
+
+        if remaining == 0:
+            self.paused_until = max(self.paused_until, time.monotonic() + time_to_reset + 1.0)
+        elif remaining < max(limit // 10, 10):
+            # Spread the remaining requests until the reset, instead of running into the limit
+            self.interval = time_to_reset / remaining
+        else:
+            self.interval = 0.0
+
+    async def _wait_for_slot(self):
+        now = time.monotonic()
+        slot = max(now, self.paused_until, self.next_slot)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def summary(self) -> str:
+        lines = [f"{'Endpoint':<72} {'Count':>6} {'Retries':>8} {'Errors':>7} {'Mean':>9} {'p50':>9} {'p95':>9} {'Max':>9}"]
+        for endpoint, stats in sorted(self.stats.items()):
+            if not stats.latencies:
+                continue
+            mean = sum(stats.latencies) / len(stats.latencies)
+            lines.append(f"{endpoint:<72} {len(stats.latencies):>6} {stats.retries:>8} {stats.errors:>7} {mean * 1000:>7.1f}ms {stats.percentile(0.5) * 1000:>7.1f}ms {stats.percentile(0.95) * 1000:>7.1f}ms {max(stats.latencies) * 1000:>7.1f}ms")
+        return "\n".join(lines)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.executor.shutdown()
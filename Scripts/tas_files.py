@@ -0,0 +1,216 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# Python port of the TAS file handling in StudioCommunication/CommandLine.cs, StudioCommunication/Parsing.cs
+# and the 'Read' command. Needs to be kept in sync with the C# implementation
+
+# Matches against command or space or both as a separator
+separator_regex = re.compile(r"(?:\s+)|(?:\s*,\s*)")
+
+@dataclass
+class CommandLine:
+    command: str
+    arguments: list[str]
+
+    def is_command(self, command: str) -> bool:
+        return self.command.lower() == command.lower()
+
+def parse_command_line(line: str) -> Optional[CommandLine]:
+    line_trimmed = line.strip()
+    if not line_trimmed or not line_trimmed[0].isalpha():
+        return None
+
+    separator_match = separator_regex.search(line_trimmed)
+    if not separator_match or len(separator_match.group(0)) == 0:
+        # No arguments
+        return CommandLine(line_trimmed, [])
+
+    separator = separator_match.group(0)
+    arguments = []
+
+    # All quotes ("), braces ({}) and brackets ([]) need to be closed before the next argument can happen
+    group_stack = []
+    current_arg = ""
+
+    i = separator_match.end()
+    while i < len(line_trimmed):
+        if not group_stack and line_trimmed.startswith(separator, i):
+            arguments.append(current_arg)
+            current_arg = ""
+            i += len(separator)
+            continue
+
+        c = line_trimmed[i]
+        if c == '"' and (not group_stack or group_stack[-1] == '"'):
+            if group_stack:
+                group_stack.pop()
+            else:
+                group_stack.append('"')
+        elif c == '[' or c == '{':
+            group_stack.append(c)
+            current_arg += c
+        elif c == ']' or c == '}':
+            if not group_stack or group_stack[-1] != ('[' if c == ']' else '{'):
+                # Unopened bracket / brace
+                return None
+            group_stack.pop()
+            current_arg += c
+        elif c == '\\':
+            # Escape next char
+            if i == len(line_trimmed) - 1:
+                # Invalid escape sequence
+                return None
+            i += 1
+            current_arg += '\n' if line_trimmed[i] == 'n' else line_trimmed[i]
+        else:
+            current_arg += c
+        i += 1
+
+    # Finish last argument
+    arguments.append(current_arg)
+
+    return CommandLine(line_trimmed[:separator_match.start()], arguments)
+
+def is_label(line: str) -> bool:
+    """A comment is considered a label, if it's a single # immediately followed by the label name"""
+    return len(line) >= 2 and line[0] == '#' and line[1].isalpha()
+
+def find_read_target_file(file_directory: str, file_path: str) -> tuple[Optional[str], str]:
+    """Resolves the target of a 'Read' command, returning the path or an error message"""
+    path = os.path.join(file_directory, file_path)
+    if not path.endswith(".tas"):
+        path += ".tas"
+
+    if os.path.isfile(path):
+        return path, ""
+
+    # Windows allows case-insensitive names, but Linux/macOS don't...
+    components = [component for component in re.split(r"[/\\]", file_path) if component]
+    if len(components) == 0:
+        return None, "No file path specified"
+
+    real_directory = file_directory
+    for directory in components[:-1]:
+        if directory == "..":
+            real_directory = os.path.dirname(os.path.abspath(real_directory))
+            continue
+
+        directories = [d for d in os.listdir(real_directory) if d.lower() == directory.lower() and os.path.isdir(os.path.join(real_directory, d))]
+        if len(directories) > 1:
+            return None, f"Ambiguous match for directory '{directory}'"
+        if len(directories) == 0:
+            return None, f"Couldn't find directory '{directory}'"
+
+        real_directory = os.path.join(real_directory, directories[0])
+
+    # Allow an optional suffix on file names. Example: 9D_04 -> 9D_04_Curiosity.tas
+    file = os.path.splitext(components[-1])[0]
+    files = [f for f in os.listdir(real_directory) if os.path.splitext(f)[0].lower().startswith(file.lower()) and os.path.isfile(os.path.join(real_directory, f))]
+
+    if len(files) > 1:
+        return None, f"Ambiguous match for file '{file}'"
+    if len(files) == 1:
+        return os.path.join(real_directory, files[0]), ""
+
+    return None, f"Couldn't find file '{file}'"
+
+def get_line_target(label_or_line_number: str, lines: list[str]) -> Optional[int]:
+    """Searches for the line number (1-indexed) of the target label in the file"""
+    try:
+        return int(label_or_line_number)
+    except ValueError:
+        pass
+
+    label_regex = re.compile(rf"^#\s*{re.escape(label_or_line_number)}$")
+    for line_number, line in enumerate(lines, start=1):
+        if label_regex.match(line.strip()):
+            return line_number
+
+    return None
+
+def find_read_targets(filepath: str) -> tuple[list[str], list[str]]:
+    """Collects the resolved target files of all 'Read' commands inside the file, returning them and any errors"""
+    file_directory = os.path.dirname(filepath) or os.getcwd()
+
+    targets = []
+    errors = []
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                # Cheap check before properly parsing the command
+                if not line.lstrip()[:4].lower() == "read":
+                    continue
+
+                command_line = parse_command_line(line)
+                if not command_line or not command_line.is_command("Read") or len(command_line.arguments) == 0:
+                    continue
+
+                target, error_message = find_read_target_file(file_directory, command_line.arguments[0])
+                if not target:
+                    errors.append(f"{filepath} line {line_number}: {error_message}")
+                    continue
+                if os.path.abspath(target) == os.path.abspath(filepath):
+                    errors.append(f"{filepath} line {line_number}: Do not allow reading the file itself")
+                    continue
+
+                target = os.path.abspath(target)
+                if target not in targets:
+                    targets.append(target)
+    except (OSError, UnicodeDecodeError) as e:
+        # A single broken file shouldn't abort building the whole graph
+        errors.append(f"{filepath}: {e}")
+
+    return targets, errors
+
+def build_read_graph(filepaths: list[str]) -> tuple[dict[str, list[str]], list[str]]:
+    """Builds the graph of 'Read' includes, starting from the files and following them transitively"""
+    graph = {}
+    errors = []
+
+    pending = [os.path.abspath(filepath) for filepath in filepaths]
+    while pending:
+        filepath = pending.pop()
+        if filepath in graph:
+            continue
+
+        targets, target_errors = find_read_targets(filepath)
+        graph[filepath] = targets
+        errors += target_errors
+        pending += [target for target in targets if target not in graph]
+
+    return graph, errors
+
+def topological_order(graph: dict[str, list[str]]) -> tuple[list[str], list[list[str]]]:
+    """Sorts the files so that each file comes after every file it reads, returning the order and any cycles"""
+    order = []
+    cycles = []
+    state = {} # 1 = visiting, 2 = done
+
+    for root in graph:
+        if root in state:
+            continue
+
+        # Iterative DFS, since include chains of full-game routes can get deep
+        stack = [(root, iter(graph[root]))]
+        path = [root]
+        state[root] = 1
+        while stack:
+            filepath, targets = stack[-1]
+            target = next(targets, None)
+            if target is None:
+                stack.pop()
+                path.pop()
+                state[filepath] = 2
+                order.append(filepath)
+                continue
+
+            if state.get(target) == 1:
+                cycles.append(path[path.index(target):] + [target])
+            elif target not in state:
+                state[target] = 1
+                stack.append((target, iter(graph.get(target, []))))
+                path.append(target)
+
+    return order, cycles
@@ -0,0 +1,240 @@
+import re
+from typing import Iterable, Iterator, Optional
+
+from action_line import ActionLine, Actions, MAX_FRAMES
+
+# Classifies a line (without its line ending) in a single match, shared by all rules
+line_regex = re.compile(r"^(?P<indent>\s*)(?:(?P<comment>#.*)|(?P<breakpoint>\*\*\*.*)|(?P<command>[^\W\d_][^\s,]*)(?P<arguments>.*)|(?P<action>\S.*))?$")
+
+class Line:
+    __slots__ = ("text", "ending", "kind", "match", "_action_line")
+
+    def __init__(self, raw: str):
+        self.text = raw.rstrip('\r\n')
+        self.ending = raw[len(self.text):]
+        self.match = line_regex.match(self.text)
+        self._action_line = None
+
+        if self.match["comment"] is not None:
+            self.kind = "comment"
+        elif self.match["breakpoint"] is not None:
+            self.kind = "breakpoint"
+        elif self.match["command"] is not None:
+            self.kind = "command"
+        elif self.match["action"] is not None:
+            self.kind = "action"
+        else:
+            self.kind = "blank"
+
+    def __str__(self):
+        return self.text + self.ending
+
+    @property
+    def command(self) -> Optional[str]:
+        return self.match["command"]
+
+    @property
+    def action_line(self) -> Optional[ActionLine]:
+        """Parsed action line, which is only parsed once and only if a rule asks for it"""
+        if self._action_line is None and self.kind == "action":
+            self._action_line = ActionLine.parse(self.text) or False
+        return self._action_line or None
+
+    def set_action_line(self, action_line: ActionLine):
+        self._action_line = action_line
+        self.text = str(action_line)
+
+class Rule:
+    name = ""
+    description = ""
+    # Kinds of lines which the rule modifies, all other lines are passed through
+    kinds = frozenset()
+
+    def __init__(self):
+        self.hits = 0
+
+    def signature(self) -> str:
+        """Identifies the rule and its configuration, to invalidate cached results when they change"""
+        return self.name
+
+    def process(self, lines: Iterable[Line]) -> Iterator[Line]:
+        for line in lines:
+            if line.kind in self.kinds and self.apply(line):
+                self.hits += 1
+            yield line
+
+    def apply(self, line: Line) -> bool:
+        """Modifies the line in-place, returning whether anything was changed"""
+        raise NotImplementedError
+
+class RenameCommandsRule(Rule):
+    name = "rename-commands"
+    description = "Replaces legacy command aliases (and any '--rename OLD=NEW') with their current name"
+    kinds = frozenset(["command"])
+
+    # Needs to be kept in sync with the 'Aliases' of the TasCommand attributes
+    legacy_names = {
+        "StartExportGameInfo": "ExportGameInfo",
+        "FinishExportGameInfo": "EndExportGameInfo",
+        "StartExportRoomInfo": "ExportRoomInfo",
+        "FinishExportRoomInfo": "EndExportRoomInfo",
+        "StartExportLibTAS": "ExportLibTAS",
+        "FinishExportLibTAS": "EndExportLibTAS",
+        "AnalogueMode": "AnalogMode",
+        "EnforceMainGame": "EnforceLegal",
+        "SkipAutoInput": "SkipInput",
+    }
+
+    def __init__(self, renames: Optional[dict[str, str]] = None):
+        super().__init__()
+        # Commands are case-insensitive
+        self.renames = { old.lower(): new for old, new in (self.legacy_names | (renames or {})).items() }
+
+    def signature(self) -> str:
+        return f"{self.name}({','.join(f'{old}={new}' for old, new in sorted(self.renames.items()))})"
+
+    def apply(self, line: Line) -> bool:
+        new_name = self.renames.get(line.command.lower())
+        if new_name is None or new_name == line.command:
+            return False
+
+        line.text = line.match["indent"] + new_name + line.match["arguments"]
+        return True
+
+class GrabBufferRule(Rule):
+    name = "grab-buffer"
+    description = "Converts the '4,D,X' grab-buffer idiom to 'Z', merging '4,D,X' / '1,D,X' into a following dash"
+
+    # Grab-buffer idiom on the first line, optionally followed by the dash which it is merged into
+    grab_dash_actions = { Actions.DOWN | Actions.DASH, Actions.DOWN | Actions.DASH2 }
+    dash_actions = Actions.DASH | Actions.DASH2
+
+    def convert_grab_buffer(self, lines: list[Line], action_line: ActionLine) -> list[Line]:
+        # Only '4,D,X' is a grab-buffer on its own, '1,D,X' needs to be merged
+        if action_line.frame_count == 4:
+            lines[0].set_action_line(ActionLine("4", Actions.DEMO_DASH))
+            self.hits += 1
+        return lines
+
+    def process(self, lines: Iterable[Line]) -> Iterator[Line]:
+        """Only keeps a single pending grab-buffer line (and blank lines after it) in memory"""
+        pending = []
+        pending_action_line = None
+        for line in lines:
+            # Parsing every action line is far slower than the conversion itself, so the raw text is checked first.
+            # Only lines with a dash can be merged into a grab-buffer, which additionally needs 'D' to be started.
+            # Actions are case-insensitive for the loose format (for example: "4dx")
+            action_line = None
+            if line.kind == "action":
+                text = line.text.upper()
+                if ("X" in text or "C" in text) and (pending or "D" in text):
+                    action_line = line.action_line
+
+            if pending:
+                if line.kind == "blank":
+                    pending.append(line)
+                    continue # Blank lines between the grab-buffer and the dash are removed when merging
+
+                if action_line and action_line.actions & self.dash_actions:
+                    # '4,D,X' + '10,R,X' => '14,R,Z'
+                    action_line.frame_count += pending_action_line.frame_count
+                    action_line.actions = (action_line.actions & ~self.dash_actions) | Actions.DEMO_DASH
+                    line.set_action_line(action_line)
+                    self.hits += 1
+                    yield line
+
+                    pending.clear()
+                    continue
+
+                # No dash to merge into, so only convert the grab-buffer itself
+                yield from self.convert_grab_buffer(pending, pending_action_line)
+                pending.clear()
+
+            if action_line and action_line.frame_count in (1, 4) and action_line.actions in self.grab_dash_actions:
+                pending.append(line)
+                pending_action_line = action_line
+                continue
+
+            yield line
+
+        if pending:
+            yield from self.convert_grab_buffer(pending, pending_action_line)
+
+class MergeActionLinesRule(Rule):
+    name = "merge-actions"
+    description = "Merges directly consecutive action lines with identical inputs (shifts line numbers used by 'Read' commands)"
+
+    @staticmethod
+    def same_inputs(a: ActionLine, b: ActionLine) -> bool:
+        return a.actions == b.actions and a.feather_angle == b.feather_angle and a.feather_magnitude == b.feather_magnitude and a.custom_bindings == b.custom_bindings
+
+    def process(self, lines: Iterable[Line]) -> Iterator[Line]:
+        previous = None
+        for line in lines:
+            action_line = line.action_line
+            if previous and action_line and action_line.frame_count > 0:
+                previous_action_line = previous.action_line
+                total_frames = previous_action_line.frame_count + action_line.frame_count
+
+                if self.same_inputs(previous_action_line, action_line) and total_frames <= MAX_FRAMES:
+                    previous_action_line.frame_count = total_frames
+                    previous.set_action_line(previous_action_line)
+                    self.hits += 1
+                    continue
+
+            if previous:
+                yield previous
+                previous = None
+
+            if action_line and action_line.frame_count > 0:
+                previous = line
+            else:
+                yield line
+
+        if previous:
+            yield previous
+
+class NormalizeFramesRule(Rule):
+    name = "normalize-frames"
+    description = "Rewrites action lines in Studio's formatting, right-aligning the frame count to 4 digits"
+    kinds = frozenset(["action"])
+
+    def apply(self, line: Line) -> bool:
+        action_line = line.action_line
+        if not action_line or str(action_line) == line.text:
+            return False
+
+        line.set_action_line(action_line)
+        return True
+
+# All available rules, in the order in which they are applied
+rules = { rule.name: rule for rule in [RenameCommandsRule, GrabBufferRule, MergeActionLinesRule, NormalizeFramesRule] }
+default_rules = [GrabBufferRule.name]
+
+class RuleSet:
+    """Applies all active rules to a stream of lines, in a single pass which classifies and parses each line once"""
+
+    def __init__(self, rule_names: Iterable[str] = default_rules, renames: Optional[dict[str, str]] = None):
+        self.rules = []
+        for name, rule in rules.items():
+            if name not in rule_names:
+                continue
+            self.rules.append(rule(renames) if rule is RenameCommandsRule else rule())
+
+    def signature(self) -> str:
+        return ";".join(rule.signature() for rule in self.rules)
+
+    def process(self, lines: Iterable[str]) -> Iterator[str]:
+        stream = (Line(line) for line in lines)
+        for rule in self.rules:
+            stream = rule.process(stream)
+
+        for line in stream:
+            yield str(line)
+
+    def take_hits(self) -> dict[str, int]:
+        """Returns the hit counter of each rule since the last call"""
+        hits = { rule.name: rule.hits for rule in self.rules }
+        for rule in self.rules:
+            rule.hits = 0
+        return hits
@@ -0,0 +1,59 @@
+import os
+import time
+import tempfile
+import unittest
+
+from gamebanana_session import SessionCache
+
+# Run with: python -m unittest discover -s Scripts -p "test_*.py"
+
+# As returned by Firefox's 'driver.get_cookies()'
+COOKIES = [
+    { "name": "sess", "value": "abc", "path": "/", "domain": ".gamebanana.com", "secure": True, "httpOnly": True, "sameSite": "Lax" },
+    { "name": "rd", "value": "1", "path": "/", "domain": ".gamebanana.com", "secure": True, "httpOnly": False, "expiry": int(time.time()) + 3600, "sameSite": "None" },
+]
+
+@unittest.skipUnless(SessionCache.is_supported(), "'cryptography' isn't installed")
+class SessionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, ".gamebanana-session")
+
+    def test_round_trip(self):
+        SessionCache(self.path, "secret").save(COOKIES)
+        self.assertEqual(SessionCache(self.path, "secret").load(), COOKIES)
+
+        # Neither the cookies nor the secret are stored in plain text
+        with open(self.path, "r") as f:
+            content = f.read()
+        self.assertNotIn("gamebanana.com", content)
+        self.assertNotIn("secret", content)
+
+    def test_other_secret(self):
+        SessionCache(self.path, "secret").save(COOKIES)
+        self.assertIsNone(SessionCache(self.path, "other").load())
+
+    def test_expired_cookie(self):
+        cache = SessionCache(self.path, "secret")
+        cache.save(COOKIES + [COOKIES[1] | { "name": "expired", "expiry": int(time.time()) - 1 }])
+        self.assertIsNone(cache.load())
+
+    def test_missing_or_corrupted(self):
+        cache = SessionCache(self.path, "secret")
+        self.assertIsNone(cache.load())
+
+        with open(self.path, "w") as f:
+            f.write("{")
+        self.assertIsNone(cache.load())
+
+        cache.clear()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_requires_secret(self):
+        with self.assertRaises(ValueError):
+            SessionCache(self.path, "")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+import gamebanana_upload
+from gamebanana_upload import UploadVerificationError, file_md5, verify_upload
+
+# Run with: python -m unittest discover -s Scripts -p "test_*.py"
+
+def response(content: bytes, content_type="application/zip", status=200) -> requests.Response:
+    res = requests.Response()
+    res.status_code = status
+    res.url = "https://gamebanana.com/dl/1234"
+    res.headers["Content-Type"] = content_type
+    res._content = content
+    res._content_consumed = True
+    return res
+
+class VerifyUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.content = os.urandom(3 * gamebanana_upload.download_chunk_size + 123)
+        fd, self.release_file = tempfile.mkstemp(suffix=".zip")
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.content)
+        self.addCleanup(os.remove, self.release_file)
+
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def verify(self, res=None, error=None):
+        with mock.patch.object(gamebanana_upload.requests, "get", return_value=res, side_effect=error) as get:
+            verify_upload("1234", file_md5(self.release_file), [{ "name": "sess", "value": "abc" }])
+        self.assertEqual(get.call_args.args[0], "https://gamebanana.com/dl/1234")
+        self.assertTrue(get.call_args.kwargs["stream"])
+
+    def test_matching_file(self):
+        self.verify(response(self.content))
+
+    def test_mismatching_file(self):
+        with self.assertRaises(UploadVerificationError):
+            self.verify(response(self.content[:-1]))
+
+    def test_download_failures_are_skipped(self):
+        self.verify(response(b"<html></html>", content_type="text/html; charset=utf-8"))
+        self.verify(response(b"", status=404))
+        self.verify(error=requests.ConnectionError("Connection refused"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import io
+import os
+import tempfile
+import contextlib
+import unittest
+from unittest import mock
+
+from github_api import GitHubClient
+from mock_github import MockGitHubServer, generate_repository
+
+# Runs the API client against the local stand-in of the GitHub API.
+# Run with: python -m unittest discover -s Scripts -p "test_*.py"
+
+REPO = "EverestAPI/CelesteTAS-EverestInterop"
+COMPARE_ENDPOINT = f"GET /repos/{REPO}/compare/{{sha}}...{{sha}}"
+
+class GitHubClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repository = generate_repository(REPO, 250, 0)
+        server = MockGitHubServer(("127.0.0.1", 0), self.repository)
+        server.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.server = server
+
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def create_client(self, cache_dir: str = None) -> GitHubClient:
+        with mock.patch.dict(os.environ, { "GITHUB_API_URL": self.server.url, "GITHUB_GRAPHQL_URL": f"{self.server.url}/graphql" }):
+            client = GitHubClient(REPO, "token", cache_dir=self.cache_dir.name if cache_dir is None else cache_dir)
+        self.addCleanup(self.close_client, client)
+        return client
+
+    @staticmethod
+    def close_client(client: GitHubClient):
+        # Only prints the request statistics
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.close()
+
+    def compare_url(self) -> str:
+        head, base = (tag["commit"]["sha"] for tag in self.repository.tags)
+        return f"repos/{REPO}/compare/{base}...{head}"
+
+    def test_pagination(self):
+        client = self.create_client(cache_dir="")
+        commits = client.get_all_pages(self.compare_url(), key="commits", per_page=100)
+
+        # All pages are merged in order
+        self.assertEqual([commit["sha"] for commit in commits], [commit["sha"] for commit in self.repository.commits])
+        self.assertEqual(self.server.request_counts[COMPARE_ENDPOINT], 3)
+
+    def test_etag_revalidation(self):
+        client = self.create_client()
+        first = client.get(f"repos/{REPO}/tags")
+        self.assertEqual(first.status_code, 200)
+
+        # The cached response is reused once the server confirms that it wasn't modified
+        second = self.create_client().get(f"repos/{REPO}/tags")
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.server.request_counts[f"GET /repos/{REPO}/tags"], 2)
+        self.assertEqual(self.server.request_counts[f"304 /repos/{REPO}/tags"], 1)
+
+    def test_immutable_responses_are_not_revalidated(self):
+        self.create_client().get_all_pages(self.compare_url(), key="commits", per_page=100)
+        client = self.create_client()
+        commits = client.get_all_pages(self.compare_url(), key="commits", per_page=100)
+
+        self.assertEqual(len(commits), len(self.repository.commits))
+        self.assertEqual(self.server.request_counts[COMPARE_ENDPOINT], 3)
+        self.assertEqual(client.stats["cached"], 3)
+
+    def test_graphql_batching(self):
+        client = self.create_client(cache_dir="")
+        shas = [commit["sha"] for commit in self.repository.commits[:120]]
+        details = client.fetch_commit_details(shas, batch_size=50)
+
+        self.assertEqual(self.server.request_counts["POST /graphql"], 3)
+        self.assertNotIn(f"GET /repos/{REPO}/commits/{{sha}}/pulls", self.server.request_counts)
+        for commit in self.repository.commits[:120]:
+            pull_requests = [{ "number": entry["number"], "url": entry["html_url"] } for entry in self.repository.pull_requests.get(commit["sha"], [])]
+            self.assertEqual(details[commit["sha"]], { "pullRequests": pull_requests, "author": commit["author"]["login"] })
+
+    def test_graphql_results_are_cached(self):
+        shas = [commit["sha"] for commit in self.repository.commits[:60]]
+        self.create_client().fetch_commit_details(shas[:30], batch_size=50)
+
+        client = self.create_client()
+        details = client.fetch_commit_details(shas, batch_size=50)
+
+        # Only the commits which weren't looked up before are requested again
+        self.assertEqual(len(details), 60)
+        self.assertEqual(self.server.request_counts["POST /graphql"], 2)
+        self.assertEqual(client.stats["cached"], 30)
+
+if __name__ == "__main__":
+    unittest.main()
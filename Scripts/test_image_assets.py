@@ -0,0 +1,64 @@
+import os
+import json
+import tempfile
+import unittest
+
+from image_assets import prune_unused_images
+
+# Run with: python -m unittest discover -s Scripts -p "test_*.py"
+
+def version_history(*sources: str) -> dict:
+    return { "categoryNames": {}, "versions": [{ "pages": [{ "text": "", "image": { "source": source, "width": 100, "height": 50 } if source else None }] } for source in sources] }
+
+class PruneUnusedImagesTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+
+        files = [
+            # Processed image, with its variants
+            "Assets/v3.47.1/Fuzzy.png", "Assets/v3.47.1/Fuzzy.85de31a62549.png", "Assets/v3.47.1/Fuzzy.85de31a62549.webp",
+            # Stale variants of an earlier revision of the image
+            "Assets/v3.47.1/Fuzzy.0123456789ab.png", "Assets/v3.47.1/Fuzzy.0123456789ab.webp",
+            # Image which couldn't be processed and is referenced directly
+            "Assets/v3.47.0/Broken.gif", "Assets/v3.47.0/Broken.fedcba987654.png",
+            # Not part of the changelog
+            "Assets/icon.png",
+        ]
+        for file in files:
+            os.makedirs(os.path.join(self.root, os.path.dirname(file)), exist_ok=True)
+            open(os.path.join(self.root, file), "wb").close()
+
+        # Paths inside the version history are relative to the repository root
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+
+        self.history_file = os.path.join(self.root, "version_history.json")
+        with open(self.history_file, "w") as f:
+            json.dump(version_history("Assets/v3.47.1/Fuzzy.85de31a62549.png", "Assets/v3.47.0/Broken.gif", None), f)
+
+    def remaining(self) -> list[str]:
+        return sorted(os.path.relpath(os.path.join(dirpath, filename), self.root) for dirpath, _, filenames in os.walk(os.path.join(self.root, "Assets")) for filename in filenames)
+
+    def test_only_referenced_images_are_kept(self):
+        removed = prune_unused_images("Assets", self.history_file)
+        self.assertEqual(self.remaining(), ["Assets/icon.png", "Assets/v3.47.0/Broken.gif", "Assets/v3.47.1/Fuzzy.85de31a62549.png"])
+        self.assertEqual(removed, [
+            "Assets/v3.47.0/Broken.fedcba987654.png",
+            "Assets/v3.47.1/Fuzzy.0123456789ab.png",
+            "Assets/v3.47.1/Fuzzy.0123456789ab.webp",
+            "Assets/v3.47.1/Fuzzy.85de31a62549.webp",
+            "Assets/v3.47.1/Fuzzy.png",
+        ])
+
+    def test_originals_are_kept_without_variants(self):
+        with open(self.history_file, "w") as f:
+            json.dump(version_history("Assets/v3.47.1/Fuzzy.png"), f)
+        prune_unused_images("Assets", self.history_file)
+        self.assertEqual(self.remaining(), ["Assets/icon.png", "Assets/v3.47.0/Broken.gif", "Assets/v3.47.1/Fuzzy.png"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import threading
+import unittest
+from unittest import mock
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
+from io import StringIO
+
+import release
+from release import Stage, run_stages, release_stages
+from gamebanana_upload import Target, PublishError
+
+# Run with: python -m unittest discover -s Scripts -p "test_*.py"
+
+TARGETS = [Target("Tool", "6715"), Target("Mod", "1234")]
+
+def quietly(function, *args):
+    # Failed stages print their traceback
+    with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+        return function(*args)
+
+class RunStagesTest(unittest.TestCase):
+
+    def test_dependencies(self):
+        results = run_stages([
+            Stage("sum", lambda a, b: a + b, ["a", "b"]),
+            Stage("a", lambda: 1),
+            Stage("b", lambda a: a + 1, ["a"]),
+        ])
+        self.assertEqual(results, { "a": 1, "b": 2, "sum": 3 })
+
+    def test_independent_stages_overlap(self):
+        # Both stages only finish once the other one started as well
+        barrier = threading.Barrier(2, timeout=5)
+        results = run_stages([Stage("a", barrier.wait), Stage("b", barrier.wait)])
+        self.assertEqual(set(results), { "a", "b" })
+
+    def test_failed_dependency_skips_stage(self):
+        def fail():
+            raise PublishError("Adding the update failed")
+
+        ran = []
+        with self.assertRaises(RuntimeError) as context:
+            quietly(run_stages, [
+                Stage("fail", fail),
+                Stage("skipped", lambda _: ran.append("skipped"), ["fail"]),
+                Stage("also skipped", lambda _: ran.append("also skipped"), ["skipped"]),
+                Stage("independent", lambda: ran.append("independent")),
+            ])
+        self.assertEqual(ran, ["independent"])
+        self.assertIn("also skipped, fail, skipped", str(context.exception))
+
+    def test_cyclic_dependencies(self):
+        with self.assertRaises(ValueError):
+            run_stages([Stage("a", lambda _: None, ["b"]), Stage("b", lambda _: None, ["a"])])
+        with self.assertRaises(ValueError):
+            run_stages([Stage("a", lambda _: None, ["unknown"])])
+
+class ReleaseStagesTest(unittest.TestCase):
+
+    def stages(self, resources: ExitStack) -> dict[str, Stage]:
+        stages = release_stages("CelesteTAS v3.47.1, Studio v3.11.0", "CHANGELOG.md", "release.zip", ".", TARGETS, True, resources)
+        return { stage.name: stage for stage in stages }
+
+    def all_dependencies(self, stages: dict[str, Stage], name: str) -> set[str]:
+        dependencies = set()
+        for dependency in stages[name].dependencies:
+            dependencies |= { dependency } | self.all_dependencies(stages, dependency)
+        return dependencies
+
+    def test_only_publishing_waits_for_changelog(self):
+        with ExitStack() as resources:
+            stages = self.stages(resources)
+        self.assertEqual(stages["gamebanana login"].dependencies, [])
+        self.assertEqual(stages["artifact hash"].dependencies, [])
+        for target in TARGETS:
+            self.assertNotIn("changelog", self.all_dependencies(stages, f"upload {target}"))
+            self.assertIn("gamebanana changelog", self.all_dependencies(stages, f"publish {target}"))
+
+    def test_publishing(self):
+        calls = []
+        def upload_file(browser, file_path, celestetas_version, studio_version, target):
+            calls.append(("upload", str(target)))
+            return f"file {target.item_id}"
+        def publish_update(browser, file_id, md5, update_json, celestetas_version, studio_version, target):
+            calls.append(("publish", str(target), file_id, md5))
+
+        browser = mock.Mock()
+        with mock.patch.object(release, "Browser", return_value=browser), \
+             mock.patch.object(release, "file_md5", return_value="md5"), \
+             mock.patch.object(release, "upload_file", upload_file), \
+             mock.patch.object(release, "publish_update", publish_update):
+            with ExitStack() as resources:
+                # The changelog itself is stood in for
+                stages = self.stages(resources) | {
+                    "versions": Stage("versions", lambda: ("3.47.1", "3.11.0")),
+                    "gamebanana changelog": Stage("gamebanana changelog", lambda: []),
+                }
+                results = run_stages([stage for name, stage in stages.items() if name in ("versions", "gamebanana changelog", "gamebanana login", "artifact hash") or name.startswith(("upload ", "publish "))])
+
+        # Logged in once and closed at the end
+        browser.login.assert_called_once_with(TARGETS[0])
+        browser.quit.assert_called_once_with()
+        for target in TARGETS:
+            self.assertEqual(results[f"publish {target}"].status, "published")
+            self.assertEqual(results[f"publish {target}"].file_id, f"file {target.item_id}")
+            self.assertLess(calls.index(("upload", str(target))), calls.index(("publish", str(target), f"file {target.item_id}", "md5")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+import requests
+
+import request_scheduler
+from request_scheduler import RequestScheduler
+from mock_github import MockGitHubServer, Throttling, generate_repository
+
+# Runs the scheduler against the local stand-in of the GitHub API, with throttling enabled.
+# Run with: python -m unittest discover -s Scripts -p "test_*.py"
+
+REPO = "EverestAPI/CelesteTAS-EverestInterop"
+TAGS_ENDPOINT = f"/repos/{REPO}/tags"
+
+class RequestSchedulerTest(unittest.TestCase):
+
+    def start(self, throttling: Throttling, max_retries=5) -> RequestScheduler:
+        server = MockGitHubServer(("127.0.0.1", 0), generate_repository(REPO, 10, 0), throttling=throttling)
+        server.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.server = server
+
+        session = requests.Session()
+        self.addCleanup(session.close)
+        scheduler = RequestScheduler(session, max_concurrency=4, max_retries=max_retries, base_delay=1.0, max_delay=60.0)
+        self.addCleanup(scheduler.close)
+
+        # Record the delays instead of actually waiting
+        self.sleeps = []
+        async def sleep(delay):
+            self.sleeps.append(delay)
+        for patcher in (mock.patch.object(request_scheduler.asyncio, "sleep", sleep), mock.patch("builtins.print")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        return scheduler
+
+    def get_tags(self, scheduler: RequestScheduler) -> requests.Response:
+        return scheduler.run(scheduler.request("GET", f"{self.server.url}{TAGS_ENDPOINT}"))
+
+    def test_retry_after(self):
+        scheduler = self.start(Throttling(secondary_limit_rate=0.5, retry_after=7, seed=3))
+        for _ in range(20):
+            self.assertEqual(self.get_tags(scheduler).status_code, 200)
+
+        # Every secondary rate limit is retried after the delay given by the server
+        throttled = self.server.request_counts[f"403 {TAGS_ENDPOINT}"]
+        self.assertGreater(throttled, 0)
+        self.assertEqual(self.server.request_counts[f"GET {TAGS_ENDPOINT}"], 20 + throttled)
+        self.assertEqual(scheduler.stats[f"GET {TAGS_ENDPOINT}"].retries, throttled)
+        self.assertEqual(self.sleeps.count(7.0), throttled)
+        self.assertTrue(all(delay <= 7.0 for delay in self.sleeps))
+
+    def test_retry_after_pauses_other_requests(self):
+        scheduler = self.start(Throttling(secondary_limit_rate=1.0, retry_after=30), max_retries=1)
+        start_time = request_scheduler.time.monotonic()
+        self.get_tags(scheduler)
+        self.assertGreaterEqual(scheduler.paused_until, start_time + 30.0)
+
+    def test_exponential_backoff(self):
+        scheduler = self.start(Throttling(error_rate=1.0), max_retries=3)
+
+        # Use the upper bound of the jitter
+        with mock.patch.object(request_scheduler.random, "uniform", side_effect=lambda low, high: high):
+            res = self.get_tags(scheduler)
+
+        self.assertEqual(res.status_code, 502)
+        self.assertEqual(self.server.request_counts[f"502 {TAGS_ENDPOINT}"], 4)
+        self.assertEqual(self.sleeps, [1.0, 2.0, 4.0])
+
+        stats = scheduler.stats[f"GET {TAGS_ENDPOINT}"]
+        self.assertEqual(stats.retries, 3)
+        self.assertEqual(stats.errors, 1)
+
+    def test_backoff_is_capped(self):
+        scheduler = self.start(Throttling(error_rate=1.0), max_retries=8)
+        with mock.patch.object(request_scheduler.random, "uniform", side_effect=lambda low, high: high):
+            self.get_tags(scheduler)
+
+        self.assertEqual(self.sleeps, [1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 60.0, 60.0])
+
+    def test_client_errors_are_not_retried(self):
+        scheduler = self.start(Throttling())
+        res = scheduler.run(scheduler.request("GET", f"{self.server.url}/repos/{REPO}/unknown"))
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(scheduler.stats[f"GET /repos/{REPO}/unknown"].errors, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from tas_rules import RuleSet
+
+def convert(text: str, rule_names=("grab-buffer",)) -> str:
+    return "".join(RuleSet(rule_names).process(text.splitlines(keepends=True)))
+
+class GrabBufferRuleTest(unittest.TestCase):
+
+    def test_standalone(self):
+        self.assertEqual(convert("   4,D,X\n   5,L\n"), "   4,Z\n   5,L\n")
+        self.assertEqual(convert("   4,D,C\n"), "   4,Z\n")
+
+    def test_merge_into_dash(self):
+        self.assertEqual(convert("   4,D,X\n  10,R,X\n"), "  14,R,Z\n")
+        self.assertEqual(convert("   1,D,X\n\n   3,L,C\n"), "   4,L,Z\n")
+
+    def test_no_dash_to_merge(self):
+        # '1,D,X' is only converted when merged
+        self.assertEqual(convert("   1,D,X\n  10,R\n"), "   1,D,X\n  10,R\n")
+        self.assertEqual(convert("   4,D,X\n  10,R\n"), "   4,Z\n  10,R\n")
+
+    def test_lowercase(self):
+        self.assertEqual(convert("   4,d,x\n  10,r,x\n"), "  14,R,Z\n")
+        self.assertEqual(convert("   4,d,c\n"), "   4,Z\n")
+
+    def test_loose_format(self):
+        self.assertEqual(convert("4dx\n10rx\n"), "  14,R,Z\n")
+        self.assertEqual(convert("1dc\n3lx\n"), "   4,L,Z\n")
+
+    def test_mixed_case(self):
+        self.assertEqual(convert("   4,D,X\n  10,r,x\n"), "  14,R,Z\n")
+        self.assertEqual(convert("   4,d,X\n  10,R,c\n"), "  14,R,Z\n")
+        self.assertEqual(convert("   4,D,x\n"), "   4,Z\n")
+
+    def test_other_lines_are_untouched(self):
+        text = "#Start\nRead,file,Start\n   4,L,X\n  10,D,J\n***\n"
+        self.assertEqual(convert(text), text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# Set to a file path to write a trace of the release scripts.
+# Files ending with '.jsonl' get one JSON object per span, everything else the Chrome trace format,
+# which can be opened with chrome://tracing or https://ui.perfetto.dev
+TRACE_ENV = "RELEASE_TRACE"
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    duration: float
+    thread: str
+    args: dict = field(default_factory=dict)
+    error: bool = False
+
+class Tracer:
+    """Collects timed spans of the stages of a script"""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.origin_timestamp = time.time()
+
+    @contextmanager
+    def span(self, name: str, **args):
+        start_time = time.perf_counter()
+        error = False
+        try:
+            yield args # Allows attaching results to the span
+        except BaseException:
+            error = True
+            raise
+        finally:
+            span = Span(name, start_time - self.origin, time.perf_counter() - start_time, threading.current_thread().name, args, error)
+            with self.lock:
+                self.spans.append(span)
+
+    def write(self, path: str):
+        pid = os.getpid()
+        with open(path, "w") as f:
+            if path.endswith(".jsonl"):
+                for span in self.spans:
+                    f.write(json.dumps({
+                        "name": span.name,
+                        "timestamp": self.origin_timestamp + span.start,
+                        "duration": span.duration,
+                        "thread": span.thread,
+                        "args": span.args,
+                        "error": span.error,
+                    }, default=str) + "\n")
+                return
+
+            # Complete events, with timestamps in microseconds
+            thread_ids = { thread: i for i, thread in enumerate(dict.fromkeys(span.thread for span in self.spans)) }
+            events = [{ "name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": { "name": thread } } for thread, tid in thread_ids.items()]
+            events += [{
+                "name": span.name,
+                "ph": "X",
+                "ts": span.start * 1_000_000,
+                "dur": span.duration * 1_000_000,
+                "pid": pid,
+                "tid": thread_ids[span.thread],
+                "args": span.args | ({ "error": True } if span.error else {}),
+            } for span in self.spans]
+            json.dump({ "traceEvents": events, "displayTimeUnit": "ms" }, f, default=str)
+
+    def summary(self) -> str:
+        stages: dict[str, list[Span]] = {}
+        for span in self.spans:
+            stages.setdefault(span.name, []).append(span)
+
+        total = time.perf_counter() - self.origin
+        lines = [f"{'Stage':<32} {'Count':>6} {'Total':>10} {'Mean':>10} {'Max':>10} {'Share':>7}"]
+        for name, spans in stages.items():
+            durations = [span.duration for span in spans]
+            lines.append(f"{name:<32} {len(spans):>6} {sum(durations):>9.3f}s {sum(durations) / len(spans):>9.3f}s {max(durations):>9.3f}s {sum(durations) / total:>7.1%}")
+        lines.append(f"{'Total':<32} {'':>6} {total:>9.3f}s")
+        return "\n".join(lines)
+
+    def finish(self):
+        """Prints the summary table and writes the trace, if requested"""
+        if not self.spans:
+            return
+
+        print(self.summary(), flush=True)
+        path = os.getenv(TRACE_ENV)
+        if path:
+            self.write(path)
+            print(f"Wrote trace to '{path}'", flush=True)
+
+tracer = Tracer()
+span = tracer.span
@@ -1,34 +1,225 @@
-import re
-import sys
 import os
+import time
+import argparse
+import hashlib
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from tas_rules import RuleSet, rules, default_rules
+from tas_files import build_read_graph, topological_order
+from file_watcher import create_watcher
 
-if len(sys.argv) > 1:
-    files = [sys.argv[1]]
-    
-else:
-    files = [f for f in os.listdir('.') if f.endswith(".tas")]
-
-regex_1Line = re.compile(r' 4,D,[X|C]')
-regex_2Line = re.compile(r' (4|1),D,[X|C]\s*(\d+)(.*)[X|C]')
-
-def ZReplace(match):
-    firstInputFrames = int(match.group(1))
-    secondInputFrames = int(match.group(2))
-    inputs = match.group(3)
-    output = ' ' + str(firstInputFrames + secondInputFrames) + inputs + 'Z'
-    return output
-
-    
-for filepath in files:
-    file = open(filepath, 'r')
-    text = file.read()
-    
-    replacedText = re.sub(regex_2Line, ZReplace, text)
-    replacedText = re.sub(regex_1Line, ' 4,Z', replacedText)
-    
-    file.close()
-
-    file = open(filepath, 'w')
-    file.write(replacedText)
-    file.close()
-        
+# Bump whenever the conversion changes, to invalidate cached results
+CONVERTER_VERSION = 4
+
+@lru_cache
+def get_rule_set(rule_names, renames):
+    # Compiled once per worker process and reused for every file
+    return RuleSet(rule_names, dict(renames))
+
+def file_hash(filepath, chunk_size=1024 * 1024):
+    content_hash = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+def convert_file(filepath, cache_entry=None, rule_set=None):
+    rule_set = rule_set or get_rule_set(tuple(default_rules), ())
+    version = f"{CONVERTER_VERSION}:{rule_set.signature()}"
+
+    stat = os.stat(filepath)
+    if cache_entry and cache_entry["version"] == version:
+        if cache_entry["mtime"] == stat.st_mtime_ns and cache_entry["size"] == stat.st_size:
+            return False, cache_entry, {}
+        # Only touched, but not modified. Hashing is much cheaper than converting into a temporary file
+        if cache_entry["size"] == stat.st_size and cache_entry["hash"] == file_hash(filepath):
+            return False, cache_entry | { "mtime": stat.st_mtime_ns }, {}
+
+    # Stream into a temporary file next to the original, which atomically replaces it on success
+    directory = os.path.dirname(os.path.abspath(filepath))
+    source_hash = hashlib.sha256()
+    result_hash = hashlib.sha256()
+
+    def read_lines(file):
+        for line in file:
+            source_hash.update(line.encode())
+            yield line
+
+    with open(filepath, 'r', encoding='utf-8', newline='') as file, \
+         tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='', dir=directory, prefix='.zconvert-', suffix='.tmp', delete=False) as temp_file:
+        try:
+            for line in rule_set.process(read_lines(file)):
+                result_hash.update(line.encode())
+                temp_file.write(line)
+        except BaseException:
+            temp_file.close()
+            os.remove(temp_file.name)
+            raise
+
+    changed = source_hash.digest() != result_hash.digest()
+
+    # Avoid bumping the modification time of files which didn't need any conversion
+    if changed:
+        os.chmod(temp_file.name, stat.st_mode & 0o7777)
+        os.replace(temp_file.name, filepath)
+        stat = os.stat(filepath)
+    else:
+        os.remove(temp_file.name)
+
+    return changed, { "hash": result_hash.hexdigest(), "version": version, "mtime": stat.st_mtime_ns, "size": stat.st_size }, rule_set.take_hits()
+
+def convert_entry(args):
+    filepath, cache_entry, rule_names, renames = args
+    try:
+        return convert_file(filepath, cache_entry, get_rule_set(rule_names, renames))
+    except (OSError, UnicodeDecodeError) as e:
+        # A single broken file shouldn't abort the run, losing the manifest entries of all other files
+        print(f"Failed to convert '{filepath}': {e}", flush=True)
+        return False, cache_entry, {}
+
+def load_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"Ignoring invalid cache file '{cache_path}'", flush=True)
+        return {}
+
+def save_cache(cache_path, cache):
+    if not cache_path:
+        return
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f)
+
+def find_files(paths, recursive):
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+
+        if not recursive:
+            files += [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".tas")]
+            continue
+
+        for root, dirs, filenames in os.walk(path):
+            # Skip hidden directories (.git, etc.)
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            files += [os.path.join(root, f) for f in sorted(filenames) if f.endswith(".tas")]
+
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrates TAS files, by default converting '4,D,X' grab-buffer idioms to 'Z'")
+    parser.add_argument("paths", nargs="*", default=["."], help="TAS files or directories to convert (default: current directory)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Search directories recursively for TAS files")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Amount of worker processes (default: CPU count)")
+    parser.add_argument("--reads", action="store_true", help="Also convert all files included through 'Read' commands, each exactly once and after the files they read")
+    parser.add_argument("--rules", default=",".join(default_rules), help=f"Comma-separated rules to apply in a single pass (default: {','.join(default_rules)}; available: {', '.join(rules)})")
+    parser.add_argument("--rename", action="append", default=[], metavar="OLD=NEW", help="Additional command to rename with the 'rename-commands' rule")
+    parser.add_argument("--list-rules", action="store_true", help="List all available rules and exit")
+    parser.add_argument("--watch", action="store_true", help="Keep running and convert files again whenever they are saved")
+    parser.add_argument("--poll", action="store_true", help="Poll for changes instead of using inotify in watch mode")
+    parser.add_argument("--debounce", type=float, default=0.05, help="Seconds without further changes before converting in watch mode (default: 0.05)")
+    parser.add_argument("--cache", default=".zconvert-cache.json", help="Manifest of already converted files (default: .zconvert-cache.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Convert all files, ignoring and not updating the manifest")
+    args = parser.parse_args()
+
+    if args.list_rules:
+        for rule in rules.values():
+            print(f"{rule.name:<20} {rule.description}")
+        return
+
+    rule_names = tuple(name.strip() for name in args.rules.split(",") if name.strip())
+    for name in rule_names:
+        if name not in rules:
+            parser.error(f"Unknown rule '{name}'")
+    renames = tuple(tuple(rename.split("=", 1)) for rename in args.rename)
+    for rename in renames:
+        if len(rename) != 2:
+            parser.error(f"Invalid rename '{rename[0]}', expected OLD=NEW")
+
+    start_time = time.perf_counter()
+    files = find_files(args.paths, args.recursive)
+
+    if args.reads:
+        graph, errors = build_read_graph(files)
+        files, cycles = topological_order(graph)
+        for error in errors:
+            print(f"Warning: {error}", flush=True)
+        for cycle in cycles:
+            print(f"Warning: Cyclic 'Read' commands: {' -> '.join(cycle)}", flush=True)
+
+    cache_path = None if args.no_cache else args.cache
+    cache = load_cache(cache_path)
+    keys = [os.path.abspath(filepath) for filepath in files]
+    entries = [(filepath, cache.get(key), rule_names, renames) for filepath, key in zip(files, keys)]
+
+    # Spawning worker processes isn't worth it for a handful of files.
+    # Files of the 'Read' graph are converted one after another, to keep their order
+    if args.jobs <= 1 or len(files) <= 1 or args.reads:
+        results = [convert_entry(entry) for entry in entries]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(executor.map(convert_entry, entries, chunksize=max(1, len(files) // (args.jobs * 4))))
+
+    hits = { name: 0 for name in rule_names }
+    for key, (_, cache_entry, file_hits) in zip(keys, results):
+        if cache_entry is not None:
+            cache[key] = cache_entry
+        for name, count in file_hits.items():
+            hits[name] += count
+    save_cache(cache_path, cache)
+
+    changed = sum(result[0] for result in results)
+    print(f"Scanned {len(files)} files, changed {changed} in {time.perf_counter() - start_time:.2f}s", flush=True)
+    for name, count in hits.items():
+        print(f"    {name:<20} {count} hits", flush=True)
+
+    if args.watch:
+        # Only explicitly specified files are watched, otherwise all TAS files inside the directories
+        watched_files = None
+        if args.reads or any(os.path.isfile(path) for path in args.paths):
+            watched_files = set(keys)
+        watch(args.paths, args.recursive, watched_files, get_rule_set(rule_names, renames), cache, cache_path, args.poll, args.debounce)
+
+def watch(paths, recursive, watched_files, rule_set, cache, cache_path, polling, debounce):
+    directories = sorted({ path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path)) for path in paths })
+    if watched_files is not None:
+        directories = sorted(set(directories) | { os.path.dirname(filepath) for filepath in watched_files })
+        recursive = recursive and any(os.path.isdir(path) for path in paths)
+
+    watcher = create_watcher(directories, recursive, polling=polling)
+    print(f"Watching {len(directories)} directories for changes using {type(watcher).__name__}...", flush=True)
+
+    try:
+        for changed_files in watcher.changes(debounce):
+            for filepath in sorted(changed_files):
+                key = os.path.abspath(filepath)
+                if (watched_files is not None and key not in watched_files) or not os.path.isfile(filepath):
+                    continue
+
+                start_time = time.perf_counter()
+                try:
+                    changed, cache[key], file_hits = convert_file(filepath, cache.get(key), rule_set)
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"Failed to convert '{filepath}': {e}", flush=True)
+                    continue
+
+                # Our own atomic write causes another event, which is skipped by the unchanged mtime
+                if changed:
+                    hits = ", ".join(f"{name}: {count}" for name, count in file_hits.items() if count > 0)
+                    print(f"Converted '{filepath}' in {(time.perf_counter() - start_time) * 1000:.1f}ms ({hits})", flush=True)
+                    save_cache(cache_path, cache)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        save_cache(cache_path, cache)
+
+if __name__ == "__main__":
+    main()